@@ -1,42 +1,111 @@
-from flask import Flask, send_from_directory
+from flask import Flask, jsonify, request
 from flask_cors import CORS
+from sqlalchemy.orm import configure_mappers
 import os
 
-from config import IMAGES_DIR
+from config import IMAGES_DIR, IMAGE_MAX_BYTES, OUTBOX_DISPATCHER
+from database import init_app as init_db, pool_status, configure_engine
+from utils import auth_cache, response_cache, outbox_worker, image_variants, metrics, compression, suggest
+from utils.image_delivery import send_image
+from utils.json_provider import OrjsonProvider
 from routes.auth import auth_bp
 from routes.product import product_bp
 from routes.user import user_bp
 from routes.notification import notification_bp
-from utils.data_initializer import create_tables, initialize_sample_data
 
-# Create tables and initialize data
-create_tables()
-initialize_sample_data()
 
-# Create Flask app
-app = Flask(__name__)
-CORS(app)
+def create_app(config=None):
+    """Build the Flask app without touching the database.
 
-# Create images directory if it doesn't exist
-os.makedirs(IMAGES_DIR, exist_ok=True)
+    `config` overrides Flask settings; a DATABASE_URL entry (with optional
+    DATABASE_REPLICA_URLS) points the process-wide engines at other databases. Schema and sample data are
+    created by `python -m utils.data_initializer`, background threads by
+    start_background_workers().
+    """
+    app = Flask(__name__)
+    # orjson encodes UUIDs and datetimes natively, so list endpoints can return rows as-is
+    app.json = OrjsonProvider(app)
+    # Room for a base64-encoded image of IMAGE_MAX_BYTES plus form/JSON overhead
+    app.config['MAX_CONTENT_LENGTH'] = IMAGE_MAX_BYTES * 4 // 3 + 64 * 1024
+    if config:
+        app.config.update(config)
+        if config.get('DATABASE_URL'):
+            configure_engine(config['DATABASE_URL'], config.get('DATABASE_REPLICA_URLS'))
+    CORS(app)
+    init_db(app)
+    metrics.init_app(app)
+    compression.init_app(app)
 
-# Register Blueprints
-app.register_blueprint(auth_bp, url_prefix='/api')
-app.register_blueprint(product_bp, url_prefix='/api')
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(notification_bp, url_prefix='/api')
+    # Resolve ORM mappers now rather than on the first request (done once in a preloading master)
+    configure_mappers()
 
-# Serve uploaded images
-@app.route('/images/<filename>')
-def serve_image(filename):
-    return send_from_directory(IMAGES_DIR, filename)
+    # Create images directory if it doesn't exist
+    os.makedirs(IMAGES_DIR, exist_ok=True)
+
+    # Register Blueprints
+    app.register_blueprint(auth_bp, url_prefix='/api')
+    app.register_blueprint(product_bp, url_prefix='/api')
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(notification_bp, url_prefix='/api')
+
+    # Serve uploaded images, optionally resized with ?w=<width>[&format=webp|jpeg]
+    @app.route('/images/<filename>')
+    def serve_image(filename):
+        width = request.args.get('w', type=int)
+        if width:
+            fmt = request.args.get('format')
+            if fmt is None:
+                fmt = 'webp' if 'image/webp' in request.headers.get('Accept', '') else 'jpeg'
+            variant = image_variants.get_variant(filename, width, fmt)
+            if variant:
+                response = send_image(image_variants.VARIANTS_DIR, variant)
+                if 'format' not in request.args:
+                    response.vary.add('Accept')
+                return response
+        return send_image(IMAGES_DIR, filename)
+
+    # Connection pool counters
+    @app.route('/pool-stats')
+    @metrics.ops_only
+    def get_pool_stats():
+        return jsonify(pool_status())
+
+    # In-process cache hit/miss counters
+    @app.route('/cache-stats')
+    @metrics.ops_only
+    def get_cache_stats():
+        return jsonify({'auth': auth_cache.stats(), 'responses': response_cache.stats(),
+                        'suggest': suggest.stats()})
+
+    # Outbox dispatcher counters and backlog
+    @app.route('/outbox-stats')
+    @metrics.ops_only
+    def get_outbox_stats():
+        return jsonify(outbox_worker.status())
+
+    # Health check endpoint
+    @app.route('/')
+    def health_check():
+        return "OK"
+
+    return app
+
+
+def start_background_workers():
+    """Start the threads each serving process needs; call after forking"""
+    # Drain the transactional outbox in the background
+    if OUTBOX_DISPATCHER == 'thread':
+        outbox_worker.start_dispatcher_thread()
+    # Build the product name autocomplete index and keep it fresh
+    suggest.start_refresher_thread()
 
-# Health check endpoint
-@app.route('/')
-def health_check():
-    return "OK"
 
 if __name__ == '__main__':
-    # In Docker, bind to all interfaces and use port 5000 (nginx will proxy from 80)
+    # Development server: prepare the database, then serve on port 5000.
+    # Production runs `python -m utils.data_initializer` once and gunicorn (see gunicorn.conf.py).
+    from utils.data_initializer import create_tables, initialize_sample_data
+    create_tables()
+    initialize_sample_data()
+    app = create_app()
+    start_background_workers()
     app.run(debug=False, host='0.0.0.0', port=5000)
-
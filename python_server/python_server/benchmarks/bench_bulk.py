@@ -0,0 +1,80 @@
+"""Bulk import and export throughput (rows/s) for NDJSON and CSV.
+
+Usage (from python_server/python_server):
+    python -m benchmarks.bench_bulk --rows 50000,200000
+
+Each size is imported through POST /api/products/bulk and then the whole
+catalog is read back through GET /api/products/export, both via the Flask
+test client with streamed bodies. Uses a throwaway SQLite database unless
+DATABASE_URL is set (see benchmarks/common.py).
+"""
+import argparse
+import csv
+import io
+import json
+import random
+import time
+
+import benchmarks.common  # noqa: F401  (configures DATABASE_URL)
+from benchmarks.common import product_name, make_app
+
+
+def build_body(fmt, rows, rng):
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(['name', 'description', 'price'])
+        for i in range(rows):
+            writer.writerow([product_name(rng, i), 'Imported by bench_bulk', round(rng.uniform(1, 500), 2)])
+    else:
+        for i in range(rows):
+            buffer.write(json.dumps({
+                'name': product_name(rng, i),
+                'description': 'Imported by bench_bulk',
+                'price': round(rng.uniform(1, 500), 2),
+            }))
+            buffer.write('\n')
+    return buffer.getvalue().encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', default='50000')
+    parser.add_argument('--formats', default='ndjson,csv')
+    args = parser.parse_args()
+    app = make_app()
+    sizes = [int(size) for size in args.rows.split(',')]
+    formats = args.formats.split(',')
+    rng = random.Random(42)
+
+    client = app.test_client()
+    token = client.post('/api/login', json={'email': 'admin@example.com', 'password': 'admin123'}).get_json()['token']
+    headers = {'Authorization': f'Bearer {token}'}
+    content_types = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+    print(f"{'format':>7} {'rows':>8} {'import rows/s':>14} {'export rows':>12} {'export rows/s':>14}")
+    for fmt in formats:
+        for rows in sizes:
+            body = build_body(fmt, rows, rng)
+            started = time.perf_counter()
+            response = client.post('/api/products/bulk', headers=headers, data=body,
+                                   content_type=content_types[fmt])
+            import_seconds = time.perf_counter() - started
+            result = response.get_json()
+            assert response.status_code == 200 and result['inserted'] == rows, result
+
+            started = time.perf_counter()
+            response = client.get('/api/products/export', headers=headers,
+                                  query_string={'format': fmt}, buffered=False)
+            exported = sum(chunk.count(b'\n') for chunk in response.response)
+            response.close()
+            export_seconds = time.perf_counter() - started
+            if fmt == 'csv':
+                exported -= 1  # header line
+
+            print(f"{fmt:>7} {rows:>8} {rows / import_seconds:>14.0f} "
+                  f"{exported:>12} {exported / export_seconds:>14.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Bytes on the wire and compression CPU for product list pages, with and without sparse fieldsets.
+
+Usage (from python_server/python_server):
+    python -m benchmarks.bench_compression --limits 10,20,50,100
+
+For each page size and fieldset, GET /api/products is fetched through the
+Flask test client and the body is compressed with every supported encoding
+(gzip, plus brotli when installed) at the configured levels. CPU is the p50
+time to compress one page; cached catalog responses pay it once per cache
+entry instead of per request. Uses a throwaway SQLite database unless
+DATABASE_URL is set (see benchmarks/common.py).
+"""
+import argparse
+from benchmarks.common import make_app, measure, percentile
+from utils.compression import ENCODINGS, compress
+
+FIELDSETS = {
+    'all': None,
+    'card': 'id,name,price,image_variants',
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--limits', default='10,20,50,100')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    app = make_app()
+    client = app.test_client()
+
+    header = f"{'fields':>6} {'limit':>6} {'identity B':>11}"
+    for encoding in ENCODINGS:
+        header += f" {encoding + ' B':>9} {encoding + ' ms':>8}"
+    print(header)
+    for name, fields in FIELDSETS.items():
+        for limit in (int(value) for value in args.limits.split(',')):
+            query = {'limit': limit}
+            if fields:
+                query['fields'] = fields
+            response = client.get('/api/products', query_string=query)
+            assert response.status_code == 200, response.get_json()
+            body = response.get_data()
+
+            line = f"{name:>6} {limit:>6} {len(body):>11}"
+            for encoding in ENCODINGS:
+                size = len(compress(body, encoding))
+                cpu_ms = percentile(measure(lambda: compress(body, encoding), args.repeat), 50)
+                line += f" {size:>9} {cpu_ms:>8.3f}"
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
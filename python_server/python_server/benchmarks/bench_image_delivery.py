@@ -0,0 +1,63 @@
+"""Worker CPU spent per MB of images served, by delivery mode.
+
+Usage (from python_server/python_server):
+    python -m benchmarks.bench_image_delivery --size 1 --requests 200
+
+`direct` streams the file body through the worker (as the Werkzeug dev
+server and the test client do when no sendfile-capable wsgi.file_wrapper
+is available); `x-accel` only emits the X-Accel-Redirect header and leaves
+the bytes to nginx; `304` is a conditional revalidation hit. CPU time is
+process time of this (single) process.
+"""
+import argparse
+import os
+import time
+import benchmarks.common  # noqa: F401  (configures DATABASE_URL)
+from benchmarks.common import make_app
+import config
+from utils import image_delivery
+
+
+def run(client, path, requests, headers=None):
+    started = time.process_time()
+    for _ in range(requests):
+        response = client.get(path, headers=headers)
+        response.get_data()
+    return (time.process_time() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=1, help='image size in MB')
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+    app = make_app()
+
+    filename = 'bench-delivery.jpg'
+    path = os.path.join(config.IMAGES_DIR, filename)
+    with open(path, 'wb') as image:
+        image.write(b'\xff\xd8\xff\xe0' + os.urandom(args.size * 1024 * 1024))
+
+    try:
+        client = app.test_client()
+        url = f'/images/{filename}'
+        served_mb = args.size * args.requests
+
+        image_delivery.IMAGE_DELIVERY = 'direct'
+        direct_ms = run(client, url, args.requests)
+        etag = client.get(url).headers['ETag']
+        not_modified_ms = run(client, url, args.requests, {'If-None-Match': etag})
+
+        image_delivery.IMAGE_DELIVERY = 'x-accel'
+        accel_ms = run(client, url, args.requests)
+    finally:
+        os.remove(path)
+
+    print(f"{'mode':>8} {'cpu ms/request':>15} {'cpu ms/MB':>10}")
+    print(f"{'direct':>8} {direct_ms / args.requests:>15.3f} {direct_ms / served_mb:>10.3f}")
+    print(f"{'x-accel':>8} {accel_ms / args.requests:>15.3f} {accel_ms / served_mb:>10.3f}")
+    print(f"{'304':>8} {not_modified_ms / args.requests:>15.3f} {'-':>10}")
+
+
+if __name__ == '__main__':
+    main()
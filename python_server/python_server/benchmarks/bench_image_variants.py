@@ -0,0 +1,69 @@
+"""CPU cost of rendering image variants, serially and on the process pool.
+
+Usage (from python_server/python_server):
+    python -m benchmarks.bench_image_variants --source images/<file>.jpg
+
+Without --source a synthetic 2400x1600 photo-like JPEG is generated.
+Variants are written to a temporary directory.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageDraw, ImageFilter
+from config import IMAGE_VARIANT_WIDTHS, IMAGE_WORKERS
+from utils.image_variants import FORMATS, render_variant
+
+
+def synthetic_jpeg(path, size=(2400, 1600)):
+    rng = random.Random(1)
+    image = Image.new('RGB', size)
+    draw = ImageDraw.Draw(image)
+    for _ in range(400):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        r = rng.randrange(20, 200)
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=tuple(rng.randrange(256) for _ in range(3)))
+    image.filter(ImageFilter.GaussianBlur(3)).save(path, 'JPEG', quality=90)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source')
+    parser.add_argument('--images', type=int, default=20, help='images rendered in the pool run')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    source = args.source
+    if not source:
+        source = os.path.join(work_dir, 'source.jpg')
+        synthetic_jpeg(source)
+    print(f"source: {source} ({os.path.getsize(source) / 1024:.0f} KB)")
+
+    print(f"{'variant':>12} {'cpu ms':>8} {'KB':>8}")
+    per_image_cpu = 0.0
+    for width in IMAGE_VARIANT_WIDTHS:
+        for fmt in FORMATS:
+            dest = os.path.join(work_dir, f"serial-{width}.{fmt}")
+            started = time.process_time()
+            render_variant(source, dest, width, fmt)
+            cpu_ms = (time.process_time() - started) * 1000
+            per_image_cpu += cpu_ms
+            print(f"{f'{width}px {fmt}':>12} {cpu_ms:>8.1f} {os.path.getsize(dest) / 1024:>8.1f}")
+    print(f"all variants of one image: {per_image_cpu:.1f} ms CPU")
+
+    jobs = [
+        (source, os.path.join(work_dir, f"pool-{i}-{width}.{fmt}"), width, fmt)
+        for i in range(args.images) for width in IMAGE_VARIANT_WIDTHS for fmt in FORMATS
+    ]
+    with ProcessPoolExecutor(max_workers=IMAGE_WORKERS) as pool:
+        started = time.perf_counter()
+        list(pool.map(render_variant, *zip(*jobs)))
+        elapsed = time.perf_counter() - started
+    print(f"pool of {IMAGE_WORKERS}: {args.images} images in {elapsed:.2f}s "
+          f"({args.images / elapsed:.1f} images/s)")
+
+
+if __name__ == '__main__':
+    main()
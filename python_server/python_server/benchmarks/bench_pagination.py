@@ -0,0 +1,58 @@
+"""Compare offset pagination (Product.get_all) with keyset pagination (Product.get_page).
+
+Usage (from python_server/python_server):
+    python -m benchmarks.bench_pagination --rows 1000000
+
+Uses a throwaway SQLite database unless DATABASE_URL is already set
+(see benchmarks/common.py).
+"""
+import argparse
+from benchmarks.common import seed_products, measure, percentile
+from database import SessionLocal
+from models.product import Product
+from utils.data_initializer import create_tables
+
+
+def timed(fn, repeat):
+    return percentile(measure(fn, repeat), 50)
+
+
+def cursor_at(db, depth):
+    """Cursor a client would hold after paging `depth` rows from the start"""
+    if depth == 0:
+        return None
+    row = (
+        db.query(Product.created_at, Product.id)
+        .order_by(Product.created_at.desc(), Product.id.desc())
+        .offset(depth - 1)
+        .first()
+    )
+    return (row.created_at, row.id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    create_tables()
+    db = SessionLocal()
+    seed_products(db, args.rows)
+
+    print(f"{'depth':>10} {'offset ms':>12} {'cursor ms':>12} {'cursor+total ms':>16}")
+    depth = 0
+    while depth < args.rows:
+        page = depth // args.limit + 1
+        cursor = cursor_at(db, depth)
+        offset_ms = timed(lambda: Product.get_all(db, page, args.limit), args.repeat)
+        cursor_ms = timed(lambda: Product.get_page(db, args.limit, cursor), args.repeat)
+        total_ms = timed(lambda: Product.get_page(db, args.limit, cursor, total_mode='exact'), args.repeat)
+        print(f"{depth:>10} {offset_ms:>12.2f} {cursor_ms:>12.2f} {total_ms:>16.2f}")
+        depth = depth * 10 if depth else args.limit * 10
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Login throughput and tail latency of one app process under each password hashing pool setting.
+
+Usage (from python_server/python_server):
+    python -m benchmarks.bench_password_hashing --configs 0:0,1:4,2:8,4:16 --clients 16 --duration 10
+
+Each configuration is WORKERS:QUEUE (PASSWORD_HASH_WORKERS and
+PASSWORD_HASH_QUEUE; 0 workers hashes inline on the request thread, as
+before the pool) and runs in its own process, standing in for one gunicorn
+worker. `--clients` threads log in back to back through the Flask test
+client for `--duration` seconds. Reported: successful logins/s, 503s/s
+shed by backpressure, and p50/p95/p99 latency of successful logins. Uses
+a throwaway SQLite database unless DATABASE_URL is set (see
+benchmarks/common.py).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+
+def run_load(clients, duration):
+    """Child process: log in from `clients` threads for `duration` seconds and print the results"""
+    import benchmarks.common  # noqa: F401  (configures DATABASE_URL)
+    from benchmarks.common import make_app
+
+    app = make_app()
+    credentials = {'email': 'admin@example.com', 'password': 'admin123'}
+    # Upgrade the seeded hash (if legacy) and compute the dummy hash before timing
+    app.test_client().post('/api/login', json=credentials)
+
+    latencies, busy, failed = [], [], []
+    deadline = time.perf_counter() + duration
+
+    def client():
+        session = app.test_client()
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            status = session.post('/api/login', json=credentials).status_code
+            if status == 200:
+                latencies.append((time.perf_counter() - started) * 1000)
+            elif status == 503:
+                busy.append(status)
+                # Real clients back off for Retry-After; a shorter pause keeps the pressure on
+                time.sleep(0.1)
+            else:
+                failed.append(status)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    print(json.dumps({'elapsed': elapsed, 'latencies': latencies, 'busy': len(busy), 'failed': len(failed)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--configs', default='0:0,1:4,2:8,4:16', help='comma-separated WORKERS:QUEUE pairs')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_load(args.clients, args.duration)
+        return
+
+    from benchmarks.common import percentile
+
+    print(f"{args.clients} clients, {args.duration:.0f}s per configuration, one process each")
+    print(f"{'workers':>7} {'queue':>6} {'logins/s':>9} {'503/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for config in args.configs.split(','):
+        workers, queue = config.split(':')
+        env = {**os.environ, 'PASSWORD_HASH_WORKERS': workers, 'PASSWORD_HASH_QUEUE': queue,
+               'OUTBOX_DISPATCHER': 'off'}
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_password_hashing', '--child',
+             '--clients', str(args.clients), '--duration', str(args.duration)],
+            env=env, check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        latencies, elapsed = result['latencies'], result['elapsed']
+        tail = [percentile(latencies, pct) for pct in (50, 95, 99)] if latencies else [0, 0, 0]
+        print(f"{workers:>7} {queue:>6} {len(latencies) / elapsed:>9.1f} {result['busy'] / elapsed:>7.1f} "
+              f"{tail[0]:>8.1f} {tail[1]:>8.1f} {tail[2]:>8.1f}"
+              f"{'  (' + str(result['failed']) + ' failed)' if result['failed'] else ''}")
+
+
+if __name__ == '__main__':
+    main()
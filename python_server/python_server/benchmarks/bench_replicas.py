@@ -0,0 +1,111 @@
+"""Read/write routing across a primary and read replicas, using SQLite files as stand-ins.
+
+Usage (from python_server/python_server):
+    python -m benchmarks.bench_replicas --replicas 2 --requests 600
+
+The primary is seeded, then copied into each replica file (a frozen
+"replica" that never catches up, which makes stale reads visible). Read
+traffic is spread over the replicas while the primary only sees writes;
+a client that just wrote keeps reading from the primary through the
+read-your-writes cookie, and a replica that cannot be reached is skipped.
+To use real databases, set DATABASE_URL to the primary and pass each
+replica with --url-replica.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+
+WORKDIR = tempfile.mkdtemp(prefix='bench-replicas-')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(WORKDIR, 'primary.db')}")
+os.environ.setdefault('READ_YOUR_WRITES_SECONDS', '1')
+
+import benchmarks.common  # noqa: F401  (configures DATABASE_URL)
+from benchmarks.common import make_app, seed_products
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+import database
+from config import READ_YOUR_WRITES_SECONDS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--replicas', type=int, default=2)
+    parser.add_argument('--requests', type=int, default=600)
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--url-replica', action='append', default=[],
+                        help='existing replica URL (repeatable); skips the SQLite copies')
+    args = parser.parse_args()
+
+    app = make_app()
+    db = database.SessionLocal()
+    seed_products(db, args.products)
+    db.close()
+
+    primary_url = os.environ['DATABASE_URL']
+    replica_urls = args.url_replica
+    if not replica_urls:
+        primary_path = make_url(primary_url).database
+        for index in range(args.replicas):
+            path = os.path.join(WORKDIR, f'replica{index}.db')
+            shutil.copyfile(primary_path, path)
+            replica_urls.append(f'sqlite:///{path}')
+    database.configure_engine(primary_url, replica_urls)
+    # Let the window after the seeding writes pass, as replicas would need it to catch up
+    time.sleep(READ_YOUR_WRITES_SECONDS)
+
+    statements = Counter()
+    names = {primary_url: 'primary', **{url: f'replica{index}' for index, url in enumerate(replica_urls)}}
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def count(conn, *args):
+        statements[names.get(conn.engine.url.render_as_string(hide_password=False), 'other')] += 1
+
+    client = app.test_client()
+    token = client.post('/api/login', json={'email': 'admin@example.com', 'password': 'admin123'}).get_json()['token']
+    headers = {'Authorization': f'Bearer {token}'}
+    statements.clear()
+
+    # Read-only traffic: distinct pages so the response cache does not absorb it
+    started = time.perf_counter()
+    for i in range(args.requests):
+        kind = i % 3
+        if kind == 0:
+            response = client.get('/api/products', query_string={'page': i % 50 + 1, 'limit': 20})
+        elif kind == 1:
+            response = client.get('/api/notifications', headers=headers)
+        else:
+            response = client.get('/api/profile', headers=headers)
+        assert response.status_code == 200, response.get_json()
+    elapsed = time.perf_counter() - started
+    print(f"{args.requests} GET requests in {elapsed:.2f}s; SQL statements per engine:")
+    for name in names.values():
+        print(f"  {name:>10} {statements[name]:>6}")
+
+    # Read-your-writes: the writer's follow-up read goes to the primary
+    statements.clear()
+    created = client.post('/api/products', headers=headers, json={'name': 'Replica Probe', 'price': 1}).get_json()
+    own_read = client.get(f"/api/products/{created['id']}")
+    other_client = app.test_client()
+    other_read = other_client.get(f"/api/products/{created['id']}")
+    print(f"write + follow-up read by the writer: {own_read.status_code} "
+          f"(cookie set: {any(c.name == database.READ_PRIMARY_COOKIE for c in client.cookie_jar)})")
+    print(f"same read by another client within the window: {other_read.status_code} "
+          f"(catalog cache misses shortly after a write read the primary)")
+    print(f"  statements: {dict(statements)}")
+
+    # Health checks: an unreachable replica is taken out of rotation after one failure
+    database.configure_engine(primary_url, replica_urls + [f"sqlite:///{os.path.join(WORKDIR, 'missing', 'replica.db')}"])
+    failures = 0
+    for i in range(30):
+        response = other_client.get('/api/notifications', headers=headers)
+        failures += response.status_code != 200
+    print(f"with one unreachable replica: {failures} failed of 30 reads; "
+          f"status: {[(r['url'][-20:], r['healthy']) for r in database.pool_status()['replicas']]}")
+    shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Compare the legacy ILIKE '%q%' name scan with the indexed, ranked search.
+
+Usage (from python_server/python_server):
+    python -m benchmarks.bench_search --rows 1000000
+
+Uses a throwaway SQLite database (FTS5) unless DATABASE_URL is already set
+(see benchmarks/common.py).
+"""
+import argparse
+import random
+from benchmarks.common import ADJECTIVES, NOUNS, seed_products, measure, percentile
+from database import SessionLocal
+from models.product import Product
+from utils.data_initializer import create_tables
+
+
+def legacy_search(db, term, limit):
+    query = db.query(Product).filter(Product.name.ilike(f"%{term}%"))
+    query.count()
+    return query.limit(limit).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    create_tables()
+    db = SessionLocal()
+    seed_products(db, args.rows)
+
+    rng = random.Random(7)
+    terms = [
+        rng.choice([
+            f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}",
+            rng.choice(NOUNS),
+            rng.choice(NOUNS)[:3],
+        ])
+        for _ in range(args.queries)
+    ]
+
+    paths = [
+        ('ilike', lambda term: legacy_search(db, term, args.limit)),
+        ('indexed', lambda term: Product.get_all(db, 1, args.limit, term)),
+        ('indexed-cursor', lambda term: Product.get_page(db, args.limit, None, term)),
+    ]
+    print(f"{'path':>15} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for label, fn in paths:
+        terms_iter = iter(terms)
+        samples = measure(lambda: fn(next(terms_iter)), len(terms))
+        print(f"{label:>15} {percentile(samples, 50):>10.2f} "
+              f"{percentile(samples, 95):>10.2f} {percentile(samples, 99):>10.2f}")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Hydration and JSON serialization cost per 1,000 products: ORM + stdlib json vs rows + orjson.
+
+Usage (from python_server/python_server):
+    python -m benchmarks.bench_serialization --batch 1000 --repeat 50
+
+"before" loads Product instances, calls to_dict() and encodes with the
+stdlib json module the way Flask's default provider does; "after" selects
+the list columns into rows and encodes them with the app's orjson provider.
+Uses a throwaway SQLite database unless DATABASE_URL is already set
+(see benchmarks/common.py).
+"""
+import argparse
+import json
+from benchmarks.common import seed_products, measure, percentile
+from database import SessionLocal
+from flask import Flask
+from models.product import Product, row_to_dict
+from utils.data_initializer import create_tables
+from utils.json_provider import OrjsonProvider
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--batch', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    create_tables()
+    db = SessionLocal()
+    seed_products(db, args.batch)
+    provider = OrjsonProvider(Flask(__name__))
+
+    def load_orm():
+        products = db.query(Product).limit(args.batch).all()
+        # Detach so the next run hydrates fresh instances instead of hitting the identity map
+        db.expunge_all()
+        return products
+
+    def load_rows():
+        return Product.list_query(db).limit(args.batch).all()
+
+    products = load_orm()
+    rows = load_rows()
+    results = {
+        'before': {
+            'hydrate': measure(load_orm, args.repeat),
+            'to dict': measure(lambda: [p.to_dict() for p in products], args.repeat),
+            'encode': measure(lambda: json.dumps([p.to_dict() for p in products], sort_keys=True,
+                                                 separators=(',', ':')), args.repeat),
+        },
+        'after': {
+            'hydrate': measure(load_rows, args.repeat),
+            'to dict': measure(lambda: [row_to_dict(row) for row in rows], args.repeat),
+            'encode': measure(lambda: provider.dumps([row_to_dict(row) for row in rows]), args.repeat),
+        },
+    }
+    db.close()
+
+    scale = 1000 / args.batch
+    print(f"ms per 1,000 products (p50 of {args.repeat} runs; encode includes to dict)")
+    print(f"{'':>8} {'hydrate':>10} {'to dict':>10} {'encode':>10} {'total':>10}")
+    for name, timings in results.items():
+        hydrate, to_dict, encode = (percentile(timings[step], 50) * scale for step in ('hydrate', 'to dict', 'encode'))
+        print(f"{name:>8} {hydrate:>10.2f} {to_dict:>10.2f} {encode:>10.2f} {hydrate + encode:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
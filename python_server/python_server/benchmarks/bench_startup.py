@@ -0,0 +1,62 @@
+"""Time from launching a server command to its first successful response.
+
+Usage (from python_server/python_server):
+    python -m benchmarks.bench_startup --cmd "python app.py" --url http://127.0.0.1:5000/api/products
+    python -m benchmarks.bench_startup --cmd "gunicorn -c gunicorn.conf.py wsgi:app" --repeat 5
+
+The command is started `--repeat` times against the same database (the
+first run may create and seed it); each run polls `--url` until it answers
+200, records the elapsed time and stops the server. Uses a throwaway SQLite
+database unless DATABASE_URL is set (see benchmarks/common.py).
+"""
+import argparse
+import os
+import shlex
+import signal
+import subprocess
+import time
+import urllib.error
+import urllib.request
+
+import benchmarks.common  # noqa: F401  (configures DATABASE_URL)
+from benchmarks.common import percentile
+
+
+def time_to_first_request(cmd, url, timeout):
+    started = time.perf_counter()
+    process = subprocess.Popen(shlex.split(cmd), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               start_new_session=True)
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"{cmd!r} exited with status {process.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except (urllib.error.URLError, ConnectionError, TimeoutError):
+                time.sleep(0.01)
+        raise RuntimeError(f"No response from {url} within {timeout}s")
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cmd', default='python app.py')
+    parser.add_argument('--url', default='http://127.0.0.1:5000/api/products')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=60)
+    args = parser.parse_args()
+
+    samples = []
+    for run in range(args.repeat):
+        elapsed = time_to_first_request(args.cmd, args.url, args.timeout)
+        samples.append(elapsed)
+        print(f"run {run + 1}: {elapsed:.0f} ms")
+    print(f"min {min(samples):.0f} ms  p50 {percentile(samples, 50):.0f} ms  max {max(samples):.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Build cost, memory and lookup latency of the in-memory name autocomplete index.
+
+Usage (from python_server/python_server):
+    python -m benchmarks.bench_suggest --rows 1000000
+
+Seeds `--rows` products, then times building the index from the (id,
+name) column load and reports the memory it holds (traced by
+tracemalloc, and scaled to a million names) and its peak while building.
+Name prefixes as typed so far ("ke", "smart", "wireless no") are timed
+against the index directly, through GET /api/products/suggest, and
+against the database search the endpoint replaces. Uses a throwaway SQLite database
+unless DATABASE_URL is set (see benchmarks/common.py).
+"""
+import argparse
+import os
+import random
+import time
+import tracemalloc
+
+os.environ.setdefault('SUGGEST_REFRESH_SECONDS', '0')
+
+from benchmarks.common import ADJECTIVES, NOUNS, make_app, seed_products, measure, percentile
+from database import SessionLocal
+from models.product import Product
+from utils import suggest
+
+
+def typed_queries(rng, count):
+    """Prefixes of product names as a user would type them"""
+    queries = []
+    while len(queries) < count:
+        text = rng.choice([rng.choice(NOUNS), f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"])
+        queries.append(text[:rng.randint(1, len(text))])
+    return queries
+
+
+def report(label, samples):
+    print(f"{label:>10} {percentile(samples, 50):>10.3f} {percentile(samples, 95):>10.3f} "
+          f"{percentile(samples, 99):>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    app = make_app()
+    db = SessionLocal()
+    seed_products(db, args.rows)
+    # Let the refresher's startup build finish rather than share the CPU with the timed ones
+    suggest.get_index()
+
+    started = time.perf_counter()
+    suggest.load(db)
+    elapsed = time.perf_counter() - started
+    # Built again under tracemalloc, which slows the build down severalfold
+    tracemalloc.start()
+    index = suggest.load(db)
+    traced, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = index.stats()
+    per_million = 1e6 / max(len(index), 1) / 2 ** 20
+    print(f"{len(index)} names, {stats['words']} distinct words, built in {elapsed:.2f}s")
+    print(f"memory: {traced / 2 ** 20:.1f} MiB held ({traced * per_million:.1f} MiB per million names), "
+          f"{peak / 2 ** 20:.1f} MiB peak while building, {stats['bytes'] / 2 ** 20:.1f} MiB by stats()")
+
+    # The startup build may predate the seeded rows
+    suggest.rebuild()
+    queries = typed_queries(random.Random(7), args.queries)
+    client = app.test_client()
+    paths = [
+        ('index', lambda query: index.search(query, args.limit)),
+        ('endpoint', lambda query: client.get('/api/products/suggest', query_string={'q': query, 'limit': args.limit})),
+        ('database', lambda query: Product.get_all(db, 1, args.limit, query)),
+    ]
+    print(f"{'path':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for label, fn in paths:
+        # The database path is orders of magnitude slower; a sample of the queries is enough
+        sample = queries if label != 'database' else queries[:200]
+        queries_iter = iter(sample)
+        report(label, measure(lambda: fn(next(queries_iter)), len(sample)))
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
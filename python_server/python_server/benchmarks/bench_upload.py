@@ -0,0 +1,76 @@
+"""Peak Python memory per upload: raw streaming body vs legacy base64 JSON.
+
+Usage (from python_server/python_server):
+    python -m benchmarks.bench_upload --sizes 1,10,50
+
+Sizes are in MB. Peak allocations are measured with tracemalloc around a
+single request through the Flask test client; the raw body is streamed
+from a file on disk so the client itself holds no copy. Uploaded files
+are removed afterwards. Uses a throwaway SQLite database unless
+DATABASE_URL is set (see benchmarks/common.py).
+"""
+import argparse
+import base64
+import os
+import tempfile
+import time
+import tracemalloc
+
+# Lift the upload limit so large sizes can be measured
+os.environ.setdefault('IMAGE_MAX_BYTES', str(1024 * 1024 * 1024))
+
+import benchmarks.common  # noqa: F401  (configures DATABASE_URL)
+from benchmarks.common import make_app
+import config
+
+
+def measure_peak(fn):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    started = time.perf_counter()
+    response = fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert response.status_code == 200, response.get_json()
+    os.remove(os.path.join(config.IMAGES_DIR, response.get_json()['filename']))
+    return peak / (1024 * 1024), elapsed * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1,5,20')
+    args = parser.parse_args()
+    app = make_app()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    client = app.test_client()
+    token = client.post('/api/login', json={'email': 'admin@example.com', 'password': 'admin123'}).get_json()['token']
+    headers = {'Authorization': f'Bearer {token}'}
+
+    print(f"{'size MB':>8} {'raw peak MB':>12} {'raw ms':>8} {'base64 peak MB':>15} {'base64 ms':>10}")
+    for size in sizes:
+        with tempfile.NamedTemporaryFile() as image:
+            image.write(b'\xff\xd8\xff\xe0')
+            for _ in range(size):
+                image.write(os.urandom(1024 * 1024))
+            image.flush()
+            length = image.tell()
+
+            def raw_upload():
+                with open(image.name, 'rb') as body:
+                    return client.post('/api/upload-image', headers=headers, input_stream=body,
+                                       content_type='application/octet-stream', content_length=length)
+
+            def base64_upload():
+                with open(image.name, 'rb') as body:
+                    encoded = base64.b64encode(body.read()).decode()
+                return client.post('/api/upload-image', headers=headers, json={'image_data': encoded})
+
+            raw_peak, raw_ms = measure_peak(raw_upload)
+            b64_peak, b64_ms = measure_peak(base64_upload)
+            print(f"{size:>8} {raw_peak:>12.2f} {raw_ms:>8.1f} {b64_peak:>15.2f} {b64_ms:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
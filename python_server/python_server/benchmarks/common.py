@@ -0,0 +1,55 @@
+"""Shared setup for the benchmark scripts.
+
+Importing this module points DATABASE_URL at a throwaway SQLite file unless
+it is already set, so it must be imported before anything that touches
+`database`.
+"""
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+if not os.environ.get('DATABASE_URL'):
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+from sqlalchemy import insert
+from models.user import User
+from models.product import Product
+from utils.seeder import ADJECTIVES, NOUNS, product_name, seeded_rng, seed_products as seed_synthetic_products  # noqa: F401
+
+
+def make_app():
+    """Create the schema and sample data, then build the app with its background workers"""
+    from app import create_app, start_background_workers
+    from utils.data_initializer import create_tables, initialize_sample_data
+    create_tables()
+    initialize_sample_data()
+    app = create_app()
+    start_background_workers()
+    return app
+
+
+def seed_products(db, rows, seed=42):
+    """Bulk insert `rows` synthetic products (no-op if the table is already that large)"""
+    if db.query(Product).count() >= rows:
+        return
+    owner = uuid.uuid4()
+    db.execute(insert(User), [{'id': owner, 'name': 'Bench', 'email': f'{owner}@bench.local'}])
+    db.commit()
+    seed_synthetic_products(db, seeded_rng(seed, 'benchmark-products'), rows, [owner], datetime.utcnow() - timedelta(seconds=rows))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def measure(fn, repeat):
+    """Run `fn` `repeat` times and return the latencies in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
@@ -0,0 +1,369 @@
+"""End-to-end HTTP load test for the /api endpoints.
+
+Usage (from python_server/python_server):
+    python -m benchmarks.http_suite --target inprocess --mixes read,write,mixed --concurrency 1,8,32
+    python -m benchmarks.http_suite --target server --duration 20
+    python -m benchmarks.http_suite --url http://localhost:5000 --compare benchmarks/results/abc1234.json
+
+Targets:
+  inprocess  Flask test client, no sockets (measures the app itself)
+  server     the app behind Werkzeug's threaded WSGI server on a local port
+  --url      any running server, e.g. gunicorn; DB query counts are unavailable
+
+Each mix is a weighted set of operations (login, product list/search/detail,
+create, upload-image, profile, notifications) run by `concurrency` client
+threads for `--duration` seconds. Reports p50/p95/p99 latency, requests/s and
+DB queries per request per operation, and writes everything to a JSON file
+(benchmarks/results/<commit>.json by default) that --compare can diff against
+a baseline, exiting non-zero on regressions. Uses a throwaway SQLite database
+and images directory unless DATABASE_URL / IMAGES_DIR are set.
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from datetime import datetime
+
+os.environ.setdefault('IMAGES_DIR', tempfile.mkdtemp(prefix='bench-images-'))
+
+import benchmarks.common  # noqa: F401  (configures DATABASE_URL)
+from benchmarks.common import NOUNS, ADJECTIVES, percentile, seed_products
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from PIL import Image
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+QUERY_HEADER = 'X-Bench-DB-Queries'
+
+MIXES = {
+    'read': {
+        'products_list': 30, 'products_search': 15, 'product_detail': 30,
+        'profile': 10, 'notifications': 10, 'unread_count': 5,
+    },
+    'write': {
+        'login': 10, 'product_create': 40, 'upload_image': 20,
+        'profile_update': 15, 'notifications_read': 15,
+    },
+    'mixed': {
+        'products_list': 25, 'products_search': 10, 'product_detail': 25, 'profile': 8,
+        'notifications': 8, 'unread_count': 8, 'login': 4, 'product_create': 5,
+        'upload_image': 2, 'profile_update': 3, 'notifications_read': 2,
+    },
+}
+
+
+class QueryCounter:
+    """WSGI middleware that reports the SQL statements each request ran in a response header"""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.local = threading.local()
+        # Every engine, so statements sent to read replicas are counted too
+        event.listen(Engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        if getattr(self.local, 'queries', None) is not None:
+            self.local.queries += 1
+
+    def __call__(self, environ, start_response):
+        self.local.queries = 0
+
+        def counting_start_response(status, headers, exc_info=None):
+            headers.append((QUERY_HEADER, str(self.local.queries)))
+            return start_response(status, headers, exc_info)
+
+        try:
+            return self.wsgi_app(environ, counting_start_response)
+        finally:
+            self.local.queries = None
+
+
+class InProcessClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, headers, body=None):
+        response = self.client.open(path, method=method, headers=headers, data=body)
+        return response.status_code, response.get_data(), response.headers.get(QUERY_HEADER)
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.connection = None
+
+    def request(self, method, path, headers, body=None):
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                data = response.read()
+                if response.getheader('Connection', '').lower() == 'close' or response.version == 10:
+                    self.connection.close()
+                    self.connection = None
+                return response.status, data, response.getheader(QUERY_HEADER)
+            except (http.client.HTTPException, ConnectionError):
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+
+
+class Context:
+    """Shared fixtures (token, product ids, images) used to build requests"""
+
+    def __init__(self, client):
+        status, body, _ = client.request('POST', '/api/login', {'Content-Type': 'application/json'},
+                                         json.dumps({'email': 'admin@example.com', 'password': 'admin123'}))
+        assert status == 200, body
+        self.auth = {'Authorization': f"Bearer {json.loads(body)['token']}"}
+        _, body, _ = client.request('GET', '/api/products?limit=100', {})
+        self.product_ids = [product['id'] for product in json.loads(body)['products']]
+        self.pages = max(json.loads(body)['pages'], 1)
+        self.images = [self._jpeg(i) for i in range(8)]
+
+    @staticmethod
+    def _jpeg(seed):
+        rng = random.Random(seed)
+        image = Image.new('RGB', (320, 240), tuple(rng.randrange(256) for _ in range(3)))
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=80)
+        return buffer.getvalue()
+
+
+def json_body(payload):
+    return {'Content-Type': 'application/json'}, json.dumps(payload)
+
+
+def build_request(operation, ctx, rng):
+    """Return (method, path, headers, body) for one operation"""
+    if operation == 'login':
+        headers, body = json_body({'email': 'admin@example.com', 'password': 'admin123'})
+        return 'POST', '/api/login', headers, body
+    if operation == 'products_list':
+        return 'GET', f"/api/products?page={rng.randint(1, min(ctx.pages, 50))}&limit=20", {}, None
+    if operation == 'products_search':
+        term = urllib.parse.quote(f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}")
+        return 'GET', f"/api/products?search={term}&limit=20", {}, None
+    if operation == 'product_detail':
+        return 'GET', f"/api/products/{rng.choice(ctx.product_ids)}", {}, None
+    if operation == 'product_create':
+        headers, body = json_body({
+            'name': f"{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS).title()} bench",
+            'description': 'Created by the HTTP benchmark', 'price': round(rng.uniform(1, 500), 2),
+        })
+        return 'POST', '/api/products', {**ctx.auth, **headers}, body
+    if operation == 'upload_image':
+        return 'POST', '/api/upload-image', {**ctx.auth, 'Content-Type': 'image/jpeg'}, rng.choice(ctx.images)
+    if operation == 'profile':
+        return 'GET', '/api/profile', ctx.auth, None
+    if operation == 'profile_update':
+        headers, body = json_body({'phone': f"+55119{rng.randrange(10 ** 8):08d}"})
+        return 'PUT', '/api/profile', {**ctx.auth, **headers}, body
+    if operation == 'notifications':
+        return 'GET', '/api/notifications?cursor=&limit=20', ctx.auth, None
+    if operation == 'unread_count':
+        return 'GET', '/api/notifications/unread-count', ctx.auth, None
+    if operation == 'notifications_read':
+        headers, body = json_body({})
+        return 'PUT', '/api/notifications/read', {**ctx.auth, **headers}, body
+    raise ValueError(f"Unknown operation {operation}")
+
+
+def run_worker(make_client, ctx, mix, seed, deadline, samples):
+    client = make_client()
+    rng = random.Random(seed)
+    operations, weights = zip(*MIXES[mix].items())
+    while time.perf_counter() < deadline:
+        operation = rng.choices(operations, weights)[0]
+        method, path, headers, body = build_request(operation, ctx, rng)
+        started = time.perf_counter()
+        try:
+            status, _, queries = client.request(method, path, headers, body)
+        except Exception:
+            status, queries = 599, None
+        samples.append((operation, (time.perf_counter() - started) * 1000, status,
+                        int(queries) if queries is not None else None))
+
+
+def summarize(samples, elapsed):
+    def stats(entries):
+        latencies = [latency for _, latency, _, _ in entries]
+        queries = [count for _, _, _, count in entries if count is not None]
+        return {
+            'requests': len(entries),
+            'errors': sum(1 for _, _, status, _ in entries if status >= 500),
+            'rps': round(len(entries) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'db_queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        }
+
+    by_operation = {}
+    for sample in samples:
+        by_operation.setdefault(sample[0], []).append(sample)
+    return {
+        'total': stats(samples),
+        'operations': {name: stats(entries) for name, entries in sorted(by_operation.items())},
+    }
+
+
+def run_load(make_client, ctx, mix, concurrency, duration, seed):
+    samples = []
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=run_worker, args=(make_client, ctx, mix, seed + i, deadline, samples))
+        for i in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(samples, time.perf_counter() - started) if samples else None
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_result(mix, concurrency, result):
+    print(f"\n{mix} x{concurrency}")
+    print(f"{'operation':>20} {'reqs':>7} {'err':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8}")
+    rows = list(result['operations'].items()) + [('TOTAL', result['total'])]
+    for name, stats in rows:
+        queries = stats['db_queries_per_request']
+        print(f"{name:>20} {stats['requests']:>7} {stats['errors']:>5} {stats['rps']:>8.1f} "
+              f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} "
+              f"{queries if queries is not None else '-':>8}")
+
+
+def compare(report, baseline, threshold):
+    """Print p95/throughput changes against `baseline`; returns the number of regressions"""
+    previous = {(run['mix'], run['concurrency']): run for run in baseline['runs']}
+    regressions = 0
+    print(f"\nCompared with {baseline['meta']['commit']} (threshold {threshold:.0f}%)")
+    for run in report['runs']:
+        old_run = previous.get((run['mix'], run['concurrency']))
+        if not old_run:
+            continue
+        for name, stats in list(run['operations'].items()) + [('TOTAL', run['total'])]:
+            old = old_run['total'] if name == 'TOTAL' else old_run['operations'].get(name)
+            if not old or not old['p95_ms'] or not old['rps']:
+                continue
+            p95_change = (stats['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100
+            rps_change = (stats['rps'] - old['rps']) / old['rps'] * 100
+            regressed = p95_change > threshold or (name == 'TOTAL' and rps_change < -threshold)
+            regressions += regressed
+            print(f"{'REGRESSION' if regressed else '':>10} {run['mix']:>6} x{run['concurrency']:<3} {name:>20} "
+                  f"p95 {old['p95_ms']:.2f} -> {stats['p95_ms']:.2f} ms ({p95_change:+.0f}%)  "
+                  f"rps {old['rps']:.0f} -> {stats['rps']:.0f} ({rps_change:+.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', choices=('inprocess', 'server'), default='inprocess')
+    parser.add_argument('--url', help='benchmark an already running server instead')
+    parser.add_argument('--mixes', default='read,write,mixed')
+    parser.add_argument('--concurrency', default='1,8,32')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per mix and concurrency level')
+    parser.add_argument('--warmup', type=float, default=2)
+    parser.add_argument('--products', type=int, default=10000, help='catalog size (local targets only)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='JSON results path (default benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', help='baseline JSON to diff against')
+    parser.add_argument('--threshold', type=float, default=10, help='regression threshold in percent')
+    args = parser.parse_args()
+    mixes = args.mixes.split(',')
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    server = None
+    target = 'url' if args.url else args.target
+    if args.url:
+        def make_client():
+            return HttpClient(args.url)
+    else:
+        import logging
+        from benchmarks.common import make_app
+        from database import SessionLocal
+        app = make_app()
+        db = SessionLocal()
+        seed_products(db, args.products, args.seed)
+        db.close()
+        app.wsgi_app = QueryCounter(app.wsgi_app)
+        if args.target == 'server':
+            from werkzeug.serving import make_server
+            logging.getLogger('werkzeug').setLevel(logging.WARNING)
+            server = make_server('127.0.0.1', 0, app, threaded=True)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f"http://127.0.0.1:{server.server_port}"
+
+            def make_client():
+                return HttpClient(base_url)
+        else:
+            def make_client():
+                return InProcessClient(app)
+
+    ctx = Context(make_client())
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'target': target,
+            'url': args.url,
+            'database': os.environ.get('DATABASE_URL', '').split('@')[-1] if not args.url else None,
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'duration': args.duration,
+            'products': args.products if not args.url else None,
+            'seed': args.seed,
+        },
+        'runs': [],
+    }
+
+    for mix in mixes:
+        if args.warmup:
+            run_load(make_client, ctx, mix, max(levels), args.warmup, args.seed)
+        for concurrency in levels:
+            result = run_load(make_client, ctx, mix, concurrency, args.duration, args.seed)
+            if result is None:
+                continue
+            print_result(mix, concurrency, result)
+            report['runs'].append({'mix': mix, 'concurrency': concurrency, **result})
+
+    if server:
+        server.shutdown()
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Hold many concurrent SSE subscribers on one worker and time the fan-out.
+
+Usage (from python_server/python_server):
+    python -m benchmarks.load_sse --subscribers 500
+
+Serves the app with Werkzeug's threaded WSGI server (one thread per open
+stream), opens the requested number of /api/notifications/stream
+connections, creates a product and measures how long every subscriber
+takes to receive the resulting notification event. Uses a throwaway
+SQLite database unless DATABASE_URL is set (see benchmarks/common.py).
+"""
+import argparse
+import json
+import logging
+import resource
+import selectors
+import socket
+import threading
+import time
+import urllib.request
+import benchmarks.common  # noqa: F401  (configures DATABASE_URL)
+from benchmarks.common import make_app
+from werkzeug.serving import make_server
+from utils.notification_broker import broker
+
+
+def request_json(base_url, path, payload, headers=None):
+    request = urllib.request.Request(
+        base_url + path, data=json.dumps(payload).encode(), method='POST',
+        headers={'Content-Type': 'application/json', **(headers or {})}
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def open_stream(port, token):
+    sock = socket.create_connection(('127.0.0.1', port))
+    sock.sendall(
+        f"GET /api/notifications/stream HTTP/1.1\r\nHost: localhost\r\n"
+        f"Authorization: Bearer {token}\r\nAccept: text/event-stream\r\n\r\n".encode()
+    )
+    sock.setblocking(False)
+    return sock
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--subscribers', type=int, default=200)
+    parser.add_argument('--timeout', type=float, default=30)
+    args = parser.parse_args()
+    app = make_app()
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    token = request_json(base_url, '/api/login', {'email': 'admin@example.com', 'password': 'admin123'})['token']
+
+    selector = selectors.DefaultSelector()
+    for _ in range(args.subscribers):
+        selector.register(open_stream(server.server_port, token), selectors.EVENT_READ, bytearray())
+
+    deadline = time.monotonic() + args.timeout
+    while broker.subscriber_count() < args.subscribers and time.monotonic() < deadline:
+        time.sleep(0.05)
+    held = broker.subscriber_count()
+    threads = threading.active_count()
+
+    published = time.perf_counter()
+    request_json(base_url, '/api/products', {'name': 'SSE load test', 'price': 1},
+                 {'Authorization': f"Bearer {token}"})
+
+    pending = {key.fileobj for key in selector.get_map().values()}
+    latencies = []
+    while pending and time.monotonic() < deadline:
+        for key, _ in selector.select(timeout=1):
+            data = key.fileobj.recv(65536)
+            key.data.extend(data)
+            if key.fileobj in pending and b'event: notification' in key.data:
+                pending.discard(key.fileobj)
+                latencies.append((time.perf_counter() - published) * 1000)
+
+    latencies.sort()
+    print(f"subscribers held: {held}  server threads: {threads}  "
+          f"max RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+    if latencies:
+        print(f"delivered: {len(latencies)}/{args.subscribers}  "
+              f"p50: {latencies[len(latencies) // 2]:.1f} ms  max: {latencies[-1]:.1f} ms")
+    else:
+        print("delivered: 0")
+
+    for key in list(selector.get_map().values()):
+        key.fileobj.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
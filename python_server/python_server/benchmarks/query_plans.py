@@ -0,0 +1,148 @@
+"""Check that product listing filters and sorts are answered from indexes.
+
+Usage (from python_server/python_server):
+    python -m benchmarks.query_plans --rows 200000
+
+Seeds `--rows` products spread over `--owners` creators and runs ANALYZE,
+then requests GET /api/products with each filter/sort combination below
+through the Flask test client. Every SELECT the request issues is
+re-run under EXPLAIN (EXPLAIN QUERY PLAN on SQLite). A plan fails when it
+reads the products table without an index (a full table scan), or when
+it sorts rows the index should already deliver in order. Exits non-zero
+on any failure. Uses a throwaway SQLite database unless DATABASE_URL is
+set (see benchmarks/common.py).
+"""
+import argparse
+import json
+import re
+import sys
+import uuid
+from datetime import datetime, timedelta
+from flask import has_request_context
+from sqlalchemy import event, insert, text
+from sqlalchemy.engine import Engine
+
+import benchmarks.common  # noqa: F401  (configures DATABASE_URL)
+from benchmarks.common import make_app, seed_synthetic_products, seeded_rng
+from database import SessionLocal
+from models.product import Product
+from models.user import User
+
+# (query string, whether the ORDER BY must come from an index)
+CASES = [
+    ('cursor=', True),
+    ('cursor=&sort=price', True),
+    ('cursor=&sort=-price', True),
+    ('cursor=&sort=name', True),
+    ('cursor=&sort=-name', True),
+    ('cursor=&sort=created_at', True),
+    ('cursor=&min_price=10&max_price=20&sort=price', True),
+    ('cursor=&min_price=10&max_price=20&sort=-price&total=exact', True),
+    ('cursor=&created_after={recent}', True),
+    ('cursor=&created_after={recent}&total=exact', True),
+    ('cursor=&created_by={owner}', True),
+    ('cursor=&created_by={owner}&sort=price', True),
+    ('cursor=&created_by={owner}&min_price=10&sort=-price', True),
+    ('page=3&limit=20&min_price=10&max_price=20&sort=price', True),
+    ('page=2&limit=20&created_by={owner}', False),
+    # Search narrows through the full-text index; its matches are then sorted
+    ('cursor=&search=lamp&min_price=10&sort=price', False),
+    ('page=1&limit=20&search=lamp&created_after={recent}&sort=-created_at', False),
+]
+
+
+class StatementLog:
+    def __init__(self):
+        self.statements = []
+        event.listen(Engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and statement.lstrip().upper().startswith('SELECT') and 'products' in statement:
+            self.statements.append((statement, parameters))
+
+
+def sqlite_problems(conn, statement, parameters, ordered):
+    details = [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+    problems = []
+    for detail in details:
+        # SCAN without USING ... INDEX reads every row of the table
+        if re.match(r'SCAN (TABLE )?products\b', detail) and 'INDEX' not in detail:
+            problems.append(detail)
+        if ordered and 'TEMP B-TREE FOR ORDER BY' in detail:
+            problems.append(detail)
+    return details, problems
+
+
+def postgres_problems(conn, statement, parameters, ordered):
+    plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+    plan = plan if isinstance(plan, list) else json.loads(plan)
+    details, problems = [], []
+
+    def walk(node, depth=0):
+        label = f"{node['Node Type']} {node.get('Index Name') or node.get('Relation Name') or ''}".strip()
+        details.append('  ' * depth + label)
+        if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') == 'products':
+            problems.append(label)
+        if ordered and node['Node Type'] in ('Sort', 'Incremental Sort'):
+            problems.append(label)
+        for child in node.get('Plans', []):
+            walk(child, depth + 1)
+
+    walk(plan[0]['Plan'])
+    return details, problems
+
+
+def seed(db, rows, owners):
+    """Bulk insert `rows` products over `owners` creators (no-op if the table is already that large)"""
+    if db.query(Product).count() >= rows:
+        return
+    owner_ids = [uuid.uuid4() for _ in range(owners)]
+    db.execute(insert(User), [{'id': owner_id, 'name': 'Owner', 'email': f'{owner_id}@plans.local'}
+                              for owner_id in owner_ids])
+    db.commit()
+    seed_synthetic_products(db, seeded_rng(42, 'plan-products'), rows, owner_ids,
+                            datetime.utcnow() - timedelta(seconds=rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--owners', type=int, default=1000)
+    parser.add_argument('--verbose', action='store_true', help='print every plan')
+    args = parser.parse_args()
+
+    app = make_app()
+    db = SessionLocal()
+    seed(db, args.rows, args.owners)
+    owner = db.execute(text("SELECT created_by FROM products WHERE created_by IS NOT NULL LIMIT 1")).scalar()
+    recent = (datetime.utcnow() - timedelta(seconds=args.rows // 100)).isoformat()
+    db.execute(text("ANALYZE"))
+    db.commit()
+
+    log = StatementLog()
+    client = app.test_client()
+    engine = db.get_bind()
+    explain = postgres_problems if engine.dialect.name == 'postgresql' else sqlite_problems
+    failed = False
+    for case, ordered in CASES:
+        query_string = case.format(owner=owner, recent=recent)
+        log.statements.clear()
+        response = client.get(f'/api/products?{query_string}')
+        problems = []
+        with engine.connect() as conn:
+            for statement, parameters in log.statements:
+                details, found = explain(conn, statement, parameters, ordered)
+                problems += found
+                if args.verbose or found:
+                    print('\n'.join(f"      {line}" for line in details))
+        ok = response.status_code == 200 and not problems
+        failed |= not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {response.status_code} {case}")
+        for problem in problems:
+            print(f"       {problem}")
+    db.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Check database round trips per write endpoint (and batch read) against a budget.
+
+Usage (from python_server/python_server):
+    python -m benchmarks.statement_budget
+
+Each endpoint is called once through the Flask test client while SQL
+statements and COMMITs issued from the request are counted (the outbox
+thread is ignored). Exits non-zero when an endpoint exceeds its budget, so
+a change that brings back a refresh SELECT or a read-before-write is
+caught. The batch product lookups are checked at 1, 50 and 300 ids with
+creators embedded: one query whatever the size, never one per id. Uses a throwaway SQLite database unless DATABASE_URL is set (see
+benchmarks/common.py).
+"""
+import sys
+import uuid
+from flask import has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import benchmarks.common  # noqa: F401  (configures DATABASE_URL)
+from benchmarks.common import make_app
+
+# (method, path, budget); paths are formatted with the fixtures below
+BUDGETS = [
+    ('POST', '/api/register', 2),
+    ('PUT', '/api/profile', 2),
+    ('POST', '/api/products', 3),
+    ('PUT', '/api/notifications/{notification_id}/read', 4),
+    ('PUT', '/api/notifications/read', 4),
+    ('GET', '/api/products?ids={ids_1}', 1),
+    ('GET', '/api/products?ids={ids_50}&include=creator', 1),
+    ('POST', '/api/products/batch', 1),
+]
+
+
+class RoundTrips:
+    def __init__(self):
+        self.statements = 0
+        self.commits = 0
+        event.listen(Engine, 'before_cursor_execute', self._statement)
+        event.listen(Engine, 'commit', self._commit)
+
+    def _statement(self, *args):
+        if has_request_context():
+            self.statements += 1
+
+    def _commit(self, *args):
+        if has_request_context():
+            self.commits += 1
+
+    def reset(self):
+        self.statements = self.commits = 0
+
+
+def main():
+    app = make_app()
+    client = app.test_client()
+    token = client.post('/api/login', json={'email': 'admin@example.com', 'password': 'admin123'}).get_json()['token']
+    headers = {'Authorization': f'Bearer {token}'}
+    # Warm the auth cache so the budgets cover the write itself
+    client.get('/api/profile', headers=headers)
+    notification_id = client.get('/api/notifications', headers=headers).get_json()[0]['id']
+    product_ids = [product['id'] for product in client.get('/api/products?limit=300').get_json()['products']]
+    # Pad with unknown ids so every batch asks for its full size
+    product_ids += [str(uuid.uuid4()) for _ in range(300 - len(product_ids))]
+    fixtures = {
+        'notification_id': notification_id,
+        'ids_1': product_ids[0],
+        'ids_50': ','.join(product_ids[:50]),
+    }
+
+    bodies = {
+        '/api/register': {'name': 'Budget', 'email': f'{uuid.uuid4()}@budget.local', 'password': 'secret'},
+        '/api/profile': {'name': 'Renamed', 'phone': '+5511999999999'},
+        '/api/products': {'name': 'Budget Product', 'price': 9.9, 'description': 'Counted'},
+        '/api/notifications/read': {},
+        '/api/products/batch': {'ids': product_ids, 'include': ['creator']},
+    }
+
+    counter = RoundTrips()
+    failed = False
+    print(f"{'endpoint':<48} {'status':>6} {'stmts':>6} {'commits':>8} {'budget':>7}")
+    for method, path, budget in BUDGETS:
+        path = path.format(**fixtures)
+        counter.reset()
+        response = client.open(path, method=method, headers=headers, json=bodies.get(path, {}))
+        trips = counter.statements + counter.commits
+        over = trips > budget or response.status_code >= 400
+        failed |= over
+        print(f"{method + ' ' + path[:42]:<48} {response.status_code:>6} {counter.statements:>6} "
+              f"{counter.commits:>8} {budget:>7}{'  OVER' if over else ''}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Fire many requests at the app and check that no pooled connection leaks.
+
+Usage (from python_server/python_server):
+    python -m benchmarks.stress_sessions --requests 10000 --threads 16
+
+Exits non-zero if connections are still checked out once all requests
+have finished. Uses a throwaway SQLite database unless DATABASE_URL is set
+(see benchmarks/common.py).
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import benchmarks.common  # noqa: F401  (configures DATABASE_URL)
+from benchmarks.common import make_app
+from database import pool_status
+
+ENDPOINTS = [
+    ('GET', '/api/products?limit=10', False),
+    ('GET', '/api/products?search=product', False),
+    ('GET', '/api/profile', True),
+    ('GET', '/api/notifications', True),
+    ('GET', '/api/products/not-a-real-id', False),
+]
+
+
+def login(client):
+    # Simultaneous logins overflow the password hashing pool; back off as told and retry
+    while True:
+        response = client.post('/api/login', json={'email': 'admin@example.com', 'password': 'admin123'})
+        if response.status_code != 503:
+            break
+        time.sleep(float(response.headers.get('Retry-After', 1)))
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+def worker(app, count, offset):
+    client = app.test_client()
+    headers = login(client)
+    failures = 0
+    for i in range(count):
+        method, path, auth = ENDPOINTS[(offset + i) % len(ENDPOINTS)]
+        response = client.open(path, method=method, headers=headers if auth else None)
+        if response.status_code >= 500:
+            failures += 1
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args()
+    app = make_app()
+
+    per_thread = args.requests // args.threads
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        failures = sum(pool.map(worker, [app] * args.threads, [per_thread] * args.threads, range(args.threads)))
+    elapsed = time.perf_counter() - started
+
+    status = pool_status()
+    print(f"requests: {per_thread * args.threads}  failures: {failures}  "
+          f"elapsed: {elapsed:.1f}s  ({per_thread * args.threads / elapsed:.0f} req/s)")
+    for key, value in status.items():
+        print(f"  {key}: {value}")
+
+    if status.get('checked_out', 0) or failures:
+        print("FAIL: connections leaked or requests errored")
+        sys.exit(1)
+    print("OK: no connections left checked out")
+
+
+if __name__ == '__main__':
+    main()
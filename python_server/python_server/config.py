@@ -4,20 +4,113 @@ import os
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 
 # Define paths for images, the only remaining file-based storage
-IMAGES_DIR = os.path.join(BASE_DIR, 'images')
+IMAGES_DIR = os.environ.get('IMAGES_DIR', os.path.join(BASE_DIR, 'images'))
 
-# Define paths for data files
-DATA_DIR = os.path.join(BASE_DIR, 'data')
-USERS_FILE = os.path.join(DATA_DIR, 'users.json')
-PRODUCTS_FILE = os.path.join(DATA_DIR, 'products.json')
-SESSIONS_FILE = os.path.join(DATA_DIR, 'sessions.json')
-NOTIFICATIONS_FILE = os.path.join(DATA_DIR, 'notifications.json')
+# Largest accepted image upload, in bytes
+IMAGE_MAX_BYTES = int(os.environ.get('IMAGE_MAX_BYTES', 10 * 1024 * 1024))
+
+# Resized image variants served with /images/<filename>?w=<width>
+IMAGE_VARIANT_WIDTHS = sorted(int(w) for w in os.environ.get('IMAGE_VARIANT_WIDTHS', '150,300,800').split(','))
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))
+IMAGE_RENDER_TIMEOUT = float(os.environ.get('IMAGE_RENDER_TIMEOUT', 10))
+
+# Image delivery: direct (send_file / wsgi.file_wrapper) or x-accel (nginx serves the file)
+IMAGE_DELIVERY = os.environ.get('IMAGE_DELIVERY', 'direct')
+IMAGE_ACCEL_PREFIX = os.environ.get('IMAGE_ACCEL_PREFIX', '/protected-images/')
+
+# Legacy JSON stores, only read by the one-off import (python -m utils.legacy_migration)
+DATA_DIR = os.environ.get('LEGACY_DATA_DIR', os.path.join(BASE_DIR, 'data'))
+# Entries upserted (and checkpointed) per transaction by the legacy import
+LEGACY_MIGRATION_BATCH_SIZE = int(os.environ.get('LEGACY_MIGRATION_BATCH_SIZE', 1000))
 
 # Database configuration
 DATABASE_URL = os.environ.get('DATABASE_URL')
 
+# Optional read replicas (comma-separated URLs) used by GET requests
+DATABASE_REPLICA_URLS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+# Seconds a replica that failed to connect stays out of rotation
+DB_REPLICA_RETRY_SECONDS = float(os.environ.get('DB_REPLICA_RETRY_SECONDS', 30))
+# Seconds a client's reads stay on the primary after it wrote (read-your-writes)
+READ_YOUR_WRITES_SECONDS = int(os.environ.get('READ_YOUR_WRITES_SECONDS', 5))
+
+# Connection pool settings (per process)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+
+# Seconds an exact product COUNT(*) is reused by cursor pagination
+PRODUCT_COUNT_CACHE_TTL = int(os.environ.get('PRODUCT_COUNT_CACHE_TTL', 30))
+
+# Most ids one batch lookup (GET /api/products?ids= or POST /api/products/batch) may ask for
+PRODUCT_BATCH_MAX_IDS = int(os.environ.get('PRODUCT_BATCH_MAX_IDS', 300))
+
+# Text search configuration used for the products search vector (PostgreSQL)
+SEARCH_LANGUAGE = os.environ.get('SEARCH_LANGUAGE', 'simple')
+
 # Secret key for JWT
 SECRET_KEY = os.environ.get('SECRET_KEY', 'a-very-secret-key')
 
+# Password hashes: scrypt cost (memory per hash is 128 * N * R bytes), computed on
+# PASSWORD_HASH_WORKERS threads (0 = inline) with at most PASSWORD_HASH_QUEUE jobs waiting
+PASSWORD_SCRYPT_N = int(os.environ.get('PASSWORD_SCRYPT_N', 2 ** 14))
+PASSWORD_SCRYPT_R = int(os.environ.get('PASSWORD_SCRYPT_R', 8))
+PASSWORD_SCRYPT_P = int(os.environ.get('PASSWORD_SCRYPT_P', 1))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 8))
+# Seconds a login or registration waits for its hash before answering 503
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5))
+
+# In-process cache of verified tokens and authenticated users
+AUTH_CACHE_SIZE = int(os.environ.get('AUTH_CACHE_SIZE', 10000))
+AUTH_CACHE_TTL = int(os.environ.get('AUTH_CACHE_TTL', 60))
+
+# Catalog response cache: memory:// (per process) or redis://host:port/db (shared)
+RESPONSE_CACHE_URL = os.environ.get('RESPONSE_CACHE_URL', 'memory://')
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 2048))
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 300))
+
+# Live notification stream: memory (single process) or postgres (LISTEN/NOTIFY across replicas)
+NOTIFICATION_BROKER = os.environ.get('NOTIFICATION_BROKER', 'memory')
+NOTIFICATION_STREAM_HEARTBEAT = float(os.environ.get('NOTIFICATION_STREAM_HEARTBEAT', 15))
+NOTIFICATION_STREAM_QUEUE_SIZE = int(os.environ.get('NOTIFICATION_STREAM_QUEUE_SIZE', 100))
+
+# Transactional outbox dispatcher: thread (in each app process) or off (run utils.outbox_worker separately)
+OUTBOX_DISPATCHER = os.environ.get('OUTBOX_DISPATCHER', 'thread')
+OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 100))
+OUTBOX_POLL_INTERVAL = float(os.environ.get('OUTBOX_POLL_INTERVAL', 2))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 5))
+# Processed events are deleted after OUTBOX_RETENTION_HOURS, dead letters after OUTBOX_DEAD_RETENTION_HOURS
+OUTBOX_RETENTION_HOURS = float(os.environ.get('OUTBOX_RETENTION_HOURS', 24))
+OUTBOX_DEAD_RETENTION_HOURS = float(os.environ.get('OUTBOX_DEAD_RETENTION_HOURS', 24 * 7))
+OUTBOX_PURGE_INTERVAL = float(os.environ.get('OUTBOX_PURGE_INTERVAL', 300))
+OUTBOX_PURGE_BATCH_SIZE = int(os.environ.get('OUTBOX_PURGE_BATCH_SIZE', 1000))
+
+# Product name autocomplete: each process keeps an in-memory index, rebuilt every
+# SUGGEST_REFRESH_SECONDS or once SUGGEST_MAX_PENDING local additions pile up
+SUGGEST_REFRESH_SECONDS = float(os.environ.get('SUGGEST_REFRESH_SECONDS', 300))
+SUGGEST_MAX_PENDING = int(os.environ.get('SUGGEST_MAX_PENDING', 1000))
+SUGGEST_MAX_LIMIT = int(os.environ.get('SUGGEST_MAX_LIMIT', 20))
+
+# Bulk product import/export
+BULK_IMPORT_BATCH_SIZE = int(os.environ.get('BULK_IMPORT_BATCH_SIZE', 5000))
+BULK_IMPORT_MAX_ERRORS = int(os.environ.get('BULK_IMPORT_MAX_ERRORS', 1000))
+BULK_EXPORT_BATCH_SIZE = int(os.environ.get('BULK_EXPORT_BATCH_SIZE', 1000))
+
+# Response compression: bodies below COMPRESSION_MIN_BYTES are sent as-is (brotli needs the Brotli package)
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 5))
+
+# Request metrics (/metrics); set PROMETHEUS_MULTIPROC_DIR when running several worker processes
+METRICS_SLOW_REQUEST_SECONDS = float(os.environ.get('METRICS_SLOW_REQUEST_SECONDS', 1.0))
+PROMETHEUS_MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+# Client networks allowed to read /metrics and the /*-stats endpoints (comma-separated CIDRs)
+OPS_ALLOWED_NETWORKS = os.environ.get('OPS_ALLOWED_NETWORKS', '127.0.0.0/8,::1/128')
+
+# Answer requests carrying `X-Profile: 1` with a profile; never enable on a public deployment
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+
 # API URL
 API_URL = os.environ.get('API_URL', 'http://localhost:5000') 
\ No newline at end of file
@@ -1,25 +1,35 @@
 from flask import request, jsonify
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from models.user import User
 from database import get_db
-from utils.helpers import hash_password, create_jwt
+from utils.helpers import create_jwt
+from utils.passwords import verify_password, PasswordHashingBusy
+
+def _hashing_busy():
+    # Shed load instead of queueing behind a login spike; clients retry shortly
+    return jsonify({'error': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
 
 def register(db):
     data = request.get_json()
     if not data or not all(k in data for k in ['name', 'email', 'password']):
         return jsonify({'error': 'Missing required fields'}), 400
 
-    if User.get_by_email(db, data['email']):
+    # The unique index on email rejects duplicates without a lookup first
+    try:
+        user = User.create(
+            db=db,
+            name=data['name'],
+            email=data['email'],
+            password=data['password'],
+            phone=data.get('phone', ''),
+            profile_image=data.get('profile_image', '')
+        )
+    except IntegrityError:
+        db.rollback()
         return jsonify({'error': 'Email already registered'}), 400
-
-    user = User.create(
-        db=db,
-        name=data['name'],
-        email=data['email'],
-        password=data['password'],
-        phone=data.get('phone', ''),
-        profile_image=data.get('profile_image', '')
-    )
+    except PasswordHashingBusy:
+        return _hashing_busy()
 
     return jsonify({
         'message': 'User registered successfully',
@@ -33,8 +43,16 @@ def login(db):
 
     user = User.get_by_email(db, data['email'])
 
-    if not user or user.password != hash_password(data['password']):
+    # Unknown emails are checked against a dummy hash so they cost the same as wrong passwords
+    try:
+        matches, new_hash = verify_password(data['password'], user.password if user else None)
+    except PasswordHashingBusy:
+        return _hashing_busy()
+    if not matches:
         return jsonify({'error': 'Invalid email or password'}), 401
+    if new_hash:
+        # Legacy SHA-256 (or older scrypt settings): upgrade now that the password is known
+        User.replace_password_hash(db, user.id, user.password, new_hash)
 
     token = create_jwt(user.id)
 
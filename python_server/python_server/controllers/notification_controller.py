@@ -1,22 +1,110 @@
-from flask import request, jsonify
+import json
+from flask import request, jsonify, Response
 from sqlalchemy.orm import Session
 from models.notification import Notification
 from models.user import User
 from database import get_db
 from dependencies import get_current_user
+from utils.helpers import decode_cursor
+from utils.notification_broker import broker
+from config import NOTIFICATION_STREAM_HEARTBEAT
+
+MAX_PAGE_SIZE = 100
+MAX_REPLAY = 100
 
 def get_notifications(db, current_user):
     if not current_user:
         return jsonify({'error': 'Authentication required'}), 401
-    
-    notifications = Notification.get_all(db)
-    return jsonify([n.to_dict() for n in notifications])
+
+    # Legacy clients send neither cursor nor limit; they get the newest MAX_PAGE_SIZE items
+    default_limit = 20 if 'cursor' in request.args else MAX_PAGE_SIZE
+    per_page = min(max(request.args.get('limit', default_limit, type=int), 1), MAX_PAGE_SIZE)
+    cursor = request.args.get('cursor', None)
+
+    decoded_cursor = None
+    if cursor:
+        decoded_cursor = decode_cursor(cursor)
+        if decoded_cursor is None:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+    notifications, next_cursor = Notification.get_page(db, current_user.id, per_page, decoded_cursor)
+
+    # Without `cursor`, keep the legacy plain-list response, holding the newest page only
+    if cursor is None:
+        return jsonify(notifications)
+    return jsonify({'notifications': notifications, 'next_cursor': next_cursor})
+
+def get_unread_count(db, current_user):
+    if not current_user:
+        return jsonify({'error': 'Authentication required'}), 401
+
+    return jsonify({'unread': Notification.unread_count(db, current_user.id)})
 
 def mark_notification_read(notification_id: str, db, current_user):
     if not current_user:
         return jsonify({'error': 'Authentication required'}), 401
 
-    notification = Notification.mark_as_read(db, notification_id)
+    notification = Notification.mark_one_as_read(db, current_user.id, notification_id)
     if notification:
-        return jsonify(notification.to_dict())
-    return jsonify({'error': 'Notification not found'}), 404 
\ No newline at end of file
+        return jsonify(notification)
+    return jsonify({'error': 'Notification not found'}), 404
+
+def mark_notifications_read(db, current_user):
+    """Mark the notifications listed in `ids`, or all of them, as read"""
+    if not current_user:
+        return jsonify({'error': 'Authentication required'}), 401
+
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if ids is not None and not isinstance(ids, list):
+        return jsonify({'error': 'ids must be a list'}), 400
+
+    marked = Notification.mark_as_read(db, current_user.id, ids)
+    return jsonify({
+        'marked': marked,
+        'unread': Notification.unread_count(db, current_user.id)
+    })
+
+
+def _sse(event):
+    return f"id: {event['id']}\nevent: notification\ndata: {json.dumps(event['data'])}\n\n"
+
+def stream_notifications(db, current_user):
+    """Server-Sent Events stream of new notifications, resumable with Last-Event-ID"""
+    if not current_user:
+        return jsonify({'error': 'Authentication required'}), 401
+
+    # Subscribe before reading the backlog so nothing published in between is lost
+    subscription = broker.subscribe()
+    backlog = []
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    cursor = decode_cursor(last_event_id) if last_event_id else None
+    if cursor:
+        try:
+            backlog = [n.to_event() for n in Notification.get_since(db, cursor, MAX_REPLAY)]
+        except Exception:
+            broker.unsubscribe(subscription)
+            raise
+
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            for event in backlog:
+                yield _sse(event)
+            if len(backlog) == MAX_REPLAY:
+                # More to replay: let the client reconnect from the last id sent
+                return
+            replayed = {event['id'] for event in backlog}
+            while not subscription.overflowed:
+                event = subscription.get(timeout=NOTIFICATION_STREAM_HEARTBEAT)
+                if event is None:
+                    yield ": heartbeat\n\n"
+                elif event['id'] not in replayed:
+                    yield _sse(event)
+        finally:
+            broker.unsubscribe(subscription)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
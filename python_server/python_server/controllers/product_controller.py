@@ -1,23 +1,143 @@
-from flask import request, jsonify
+import logging
+import math
+from flask import request, jsonify, Response, stream_with_context
 from sqlalchemy.orm import Session
-from models.product import Product
+from models.product import (
+    Product, PRODUCT_FIELDS, PRODUCT_SORTS, DEFAULT_CURSOR_SORT, CURSOR_PARSERS, invalidate_catalog
+)
 from models.user import User
 from models.notification import Notification
+from models.outbox import OutboxEvent
 from database import get_db
 from dependencies import get_current_user
-from utils.helpers import save_base64_image
-from config import API_URL
-import uuid
+from utils.helpers import save_base64_image, decode_cursor, parse_fields, parse_uuid, parse_datetime
+from utils import image_store, image_variants, bulk_io, suggest
+from config import API_URL, BULK_IMPORT_BATCH_SIZE, BULK_IMPORT_MAX_ERRORS, BULK_EXPORT_BATCH_SIZE, PRODUCT_BATCH_MAX_IDS, SUGGEST_MAX_LIMIT
+
+logger = logging.getLogger(__name__)
+
+MAX_PAGE_SIZE = 100
+
+# Related records a batch lookup may embed with include=
+BATCH_INCLUDES = ('creator',)
+
+def _requested_fields():
+    """Sparse fieldset from `fields=`: (None, None) for every field, (None, error response) if invalid"""
+    value = request.args.get('fields')
+    if not value:
+        return None, None
+    fields = parse_fields(value, PRODUCT_FIELDS)
+    if fields is None:
+        return None, (jsonify({'error': f"Invalid fields, choose from: {', '.join(PRODUCT_FIELDS)}"}), 400)
+    return fields, None
+
+def _parse_price(value):
+    try:
+        price = float(value)
+    except ValueError:
+        return None
+    return price if math.isfinite(price) else None
+
+# Listing filters and how each query-string value is parsed (None when invalid)
+_FILTER_PARSERS = {
+    'min_price': _parse_price,
+    'max_price': _parse_price,
+    'created_after': parse_datetime,
+    'created_by': parse_uuid,
+}
+
+def _requested_filters():
+    """Listing filters from the query string: (filters, None), or (None, error response) if one is invalid"""
+    filters = {}
+    for name, parse in _FILTER_PARSERS.items():
+        value = request.args.get(name)
+        if not value:
+            continue
+        filters[name] = parse(value)
+        if filters[name] is None:
+            return None, (jsonify({'error': f'Invalid {name}'}), 400)
+    return filters, None
+
+def _batch_lookup(db, ids, include):
+    """Shared by GET /products?ids= and POST /products/batch"""
+    if not ids:
+        return jsonify({'error': 'ids must list at least one product id'}), 400
+    if len(ids) > PRODUCT_BATCH_MAX_IDS:
+        return jsonify({'error': f'At most {PRODUCT_BATCH_MAX_IDS} ids per request'}), 400
+    if any(name not in BATCH_INCLUDES for name in include):
+        return jsonify({'error': f"Invalid include, choose from: {', '.join(BATCH_INCLUDES)}"}), 400
+    fields, error = _requested_fields()
+    if error:
+        return error
+    products, missing = Product.get_many(db, ids, fields, include_creator='creator' in include)
+    return jsonify({'products': products, 'missing': missing})
+
+def _split(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
 
 def get_products(db):
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('limit', 10, type=int)
+    # ids= turns the listing into a batch lookup, in the order given
+    if 'ids' in request.args:
+        return _batch_lookup(db, _split(request.args['ids']), _split(request.args.get('include', '')))
+
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('limit', 10, type=int), 1), MAX_PAGE_SIZE)
     search_query = request.args.get('search', None)
-    
-    result = Product.get_all(db, page, per_page, search_query)
+    cursor = request.args.get('cursor', None)
+    sort = request.args.get('sort') or None
+    fields, error = _requested_fields()
+    if error:
+        return error
+    filters, error = _requested_filters()
+    if error:
+        return error
+    if sort is not None and sort not in PRODUCT_SORTS:
+        return jsonify({'error': f"Invalid sort, choose from: {', '.join(PRODUCT_SORTS)}"}), 400
+
+    # Cursor mode: `cursor=` (empty) requests the first page
+    if cursor is not None:
+        sort = sort or DEFAULT_CURSOR_SORT
+        decoded_cursor = None
+        if cursor:
+            decoded_cursor = decode_cursor(cursor, CURSOR_PARSERS[PRODUCT_SORTS[sort][0]])
+            if decoded_cursor is None:
+                return jsonify({'error': 'Invalid cursor'}), 400
+        total_mode = request.args.get('total', None)
+        result = Product.get_page(db, per_page, decoded_cursor, search_query, total_mode, fields, filters, sort)
+        return jsonify(result)
+
+    result = Product.get_all(db, page, per_page, search_query, fields, filters, sort)
     return jsonify(result)
 
+def get_products_batch(db):
+    """Batch lookup for id lists too long for a query string"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('ids'), list):
+        return jsonify({'error': 'Body must be {"ids": [...]}'}), 400
+    include = data.get('include', [])
+    if not isinstance(include, list) or not all(isinstance(item, str) for item in data['ids'] + include):
+        return jsonify({'error': 'ids and include must be lists of strings'}), 400
+    return _batch_lookup(db, data['ids'], include)
+
+def suggest_products():
+    """Name autocomplete from the in-memory index; the database is only read to build it"""
+    query = request.args.get('q', '')
+    try:
+        limit = min(int(request.args.get('limit', 10)), SUGGEST_MAX_LIMIT)
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+    return jsonify({'suggestions': suggest.suggest(query, limit)})
+
 def get_product(product_id: str, db):
+    fields, error = _requested_fields()
+    if error:
+        return error
+    if fields:
+        product = Product.get_fields_by_id(db, product_id, fields)
+        if product:
+            return jsonify(product)
+        return jsonify({'error': 'Product not found'}), 404
+
     product = Product.get_by_id(db, product_id)
     if product:
         return jsonify(product.to_dict())
@@ -30,42 +150,119 @@ def create_product(db, current_user):
     data = request.get_json()
     if not data or not all(k in data for k in ['name', 'price']):
         return jsonify({'error': 'Missing required fields'}), 400
+    # RETURNING echoes the bound value, so store (and return) the price as a float
+    try:
+        price = float(data['price'])
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid price'}), 400
 
     new_product = Product.create(
         db=db,
         name=data['name'],
         description=data.get('description', ''),
-        price=data['price'],
+        price=price,
         image_url=data.get('image_url', ''),
-        created_by=current_user.id
+        created_by=current_user.id,
+        notify=True
     )
-    
-    # Create a notification for the new product
-    notification_message = f'New product "{data["name"]}" has been added to the catalog.'
-    Notification.create(db=db, message=notification_message)
-    
+
     return jsonify(new_product.to_dict()), 201
 
+def bulk_import_products(db, current_user):
+    """Import products from a streamed NDJSON or CSV body, committing one batch at a time"""
+    if not current_user:
+        return jsonify({'error': 'Authentication required'}), 401
+
+    fmt = bulk_io.detect_format(request.mimetype, request.args.get('format'))
+    if fmt is None:
+        return jsonify({'error': 'Unsupported format, send application/x-ndjson or text/csv'}), 415
+
+    inserted = 0
+    failed = 0
+    errors = []
+    batch = []
+    # request.stream is read incrementally; MAX_CONTENT_LENGTH only applies to form/data parsing
+    for line_number, record, error in bulk_io.read_records(request.stream, fmt):
+        values = None
+        if error is None:
+            values, error = bulk_io.validate_record(record)
+        if error:
+            failed += 1
+            if len(errors) < BULK_IMPORT_MAX_ERRORS:
+                errors.append({'line': line_number, 'error': error})
+            continue
+        batch.append(values)
+        if len(batch) >= BULK_IMPORT_BATCH_SIZE:
+            inserted += Product.bulk_insert(db, batch, current_user.id)
+            db.commit()
+            batch = []
+
+    inserted += Product.bulk_insert(db, batch, current_user.id)
+    if inserted:
+        # One summary notification for the whole import instead of one per product
+        OutboxEvent.add(db, 'products.imported', {'count': inserted})
+    db.commit()
+    if inserted:
+        invalidate_catalog()
+        suggest.request_refresh()
+
+    return jsonify({
+        'inserted': inserted,
+        'failed': failed,
+        'errors': errors,
+        'errors_truncated': failed > len(errors)
+    }), 200
+
+def export_products(db, current_user):
+    """Stream the whole catalog as NDJSON (default) or CSV"""
+    if not current_user:
+        return jsonify({'error': 'Authentication required'}), 401
+
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in bulk_io.FORMATS:
+        return jsonify({'error': 'Unsupported format'}), 400
+
+    rows = Product.iter_export(db, batch_size=BULK_EXPORT_BATCH_SIZE)
+    response = Response(
+        stream_with_context(bulk_io.write_records(rows, fmt)),
+        mimetype=bulk_io.MIMETYPES[fmt]
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename=products.{fmt}'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 def upload_image(current_user):
-    """Upload image from base64 data"""
+    """Upload an image as multipart form data, a raw binary body or base64 JSON"""
     if not current_user:
         return jsonify({'error': 'Authentication required'}), 401
-    
-    data = request.get_json()
-    
-    if not data or 'image_data' not in data:
-        return jsonify({'error': 'Image data is required'}), 400
-    
-    filename = f"{uuid.uuid4()}.jpg"
-    
-    filepath = save_base64_image(data['image_data'], filename)
-    
-    if filepath:
-        image_url = f"{API_URL}/images/{filename}" 
-        return jsonify({
-            'message': 'Image uploaded successfully',
-            'image_url': image_url,
-            'filename': filename
-        }), 200
-    else:
-        return jsonify({'error': 'Failed to save image'}), 500 
\ No newline at end of file
+
+    try:
+        if request.mimetype == 'multipart/form-data':
+            upload = request.files.get('image') or request.files.get('file')
+            if upload is None:
+                return jsonify({'error': 'Image file is required'}), 400
+            filename, deduplicated = image_store.save_stream(upload.stream)
+        elif request.mimetype == 'application/octet-stream' or request.mimetype.startswith('image/'):
+            filename, deduplicated = image_store.save_stream(request.stream)
+        else:
+            # Legacy JSON body: {"image_data": "<base64>"}
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict) or 'image_data' not in data:
+                return jsonify({'error': 'Image data is required'}), 400
+            filename, deduplicated = save_base64_image(data['image_data'])
+    except image_store.UploadError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except OSError:
+        logger.exception("Error saving image")
+        return jsonify({'error': 'Failed to save image'}), 500
+
+    # Render thumbnails in the background so the first list view finds them on disk
+    image_variants.prewarm(filename)
+
+    image_url = f"{API_URL}/images/{filename}"
+    return jsonify({
+        'message': 'Image uploaded successfully',
+        'image_url': image_url,
+        'filename': filename,
+        'deduplicated': deduplicated
+    }), 200
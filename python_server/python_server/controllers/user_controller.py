@@ -1,4 +1,5 @@
 from flask import request, jsonify
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from models.user import User
 from database import get_db
@@ -13,13 +14,16 @@ def update_profile(db, current_user):
     if not current_user:
         return jsonify({'error': 'Authentication required'}), 401
 
-    data = request.get_json()
-    
-    # Exclude password from general update, handle it separately
-    if 'password' in data:
-        del data['password']
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Invalid JSON body'}), 400
 
-    updated_user = User.update(db, current_user.id, data)
+    # Only User.UPDATABLE_FIELDS are written; the password is never changed here
+    try:
+        updated_user = User.update(db, current_user.id, data)
+    except IntegrityError:
+        db.rollback()
+        return jsonify({'error': 'Email already registered'}), 400
 
     if updated_user:
         return jsonify(updated_user.to_dict())
@@ -1,15 +1,278 @@
-from sqlalchemy import create_engine
+"""Engines, sessions and per-request session handling.
+
+The primary engine comes from DATABASE_URL. With DATABASE_REPLICA_URLS set,
+read-only requests (GET/HEAD/OPTIONS) get a session that reads from a
+replica chosen round-robin, skipping replicas that recently failed to
+connect. Flushes and INSERT/UPDATE/DELETE statements always go to the
+primary, and once a session has written it stays there. A request that
+committed a write sets a short-lived cookie so that the client's follow-up
+reads also go to the primary (read-your-writes) while replicas catch up.
+"""
+import time
+import threading
+from flask import g, has_request_context, request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from config import DATABASE_URL
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.dml import UpdateBase
+from config import (
+    DATABASE_URL, DATABASE_REPLICA_URLS, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING, DB_REPLICA_RETRY_SECONDS, READ_YOUR_WRITES_SECONDS
+)
+
+READ_PRIMARY_COOKIE = 'db_read_primary'
+READ_ONLY_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+
+class PoolStats:
+    """Cumulative connection pool counters, shared by every pool in the process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_checkout(self, waited, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection.
+
+    The measured time includes opening a new DBAPI connection when the pool
+    has not reached its size yet.
+    """
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            pool_stats.record_checkout(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_stats.record_checkout(time.perf_counter() - started)
+        return connection
+
+
+def _engine_options(url):
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        # In-memory SQLite must keep its single-connection pool
+        return {}
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING,
+    }
+
+
+class ReplicaSet:
+    """Read replica engines handed out round-robin, skipping recently failed ones"""
+
+    def __init__(self, urls):
+        self._lock = threading.Lock()
+        self._next = 0
+        self.replicas = []
+        for url in urls:
+            engine = create_engine(url, **_engine_options(url))
+            replica = {'url': url, 'engine': engine, 'down_until': 0.0, 'failures': 0}
+            event.listen(engine, 'handle_error', self._error_listener(replica))
+            self.replicas.append(replica)
+
+    def _error_listener(self, replica):
+        def on_error(context):
+            # Connection failures take the replica out of rotation; query errors do not
+            if context.is_disconnect or context.connection is None:
+                with self._lock:
+                    replica['down_until'] = time.monotonic() + DB_REPLICA_RETRY_SECONDS
+                    replica['failures'] += 1
+        return on_error
+
+    def choose(self):
+        """Next healthy replica engine, or None when every replica is down"""
+        now = time.monotonic()
+        with self._lock:
+            count = len(self.replicas)
+            candidates = [self.replicas[(self._next + offset) % count] for offset in range(count)]
+            self._next = (self._next + 1) % count
+        for replica in candidates:
+            if replica['down_until'] > now:
+                continue
+            if replica['down_until'] and not self._probe(replica):
+                continue
+            return replica['engine']
+        return None
+
+    def _probe(self, replica):
+        """Check a replica coming back from a failure before routing requests to it again"""
+        try:
+            with replica['engine'].connect():
+                pass
+        except DBAPIError:
+            # handle_error has already pushed down_until forward again
+            return False
+        replica['down_until'] = 0.0
+        return True
+
+    def dispose(self, close=True):
+        for replica in self.replicas:
+            replica['engine'].dispose(close=close)
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    def status(self):
+        now = time.monotonic()
+        return [{
+            'url': make_url(replica['url']).render_as_string(hide_password=True),
+            'healthy': replica['down_until'] <= now,
+            'failures': replica['failures'],
+        } for replica in self.replicas]
+
+
+class RoutingSession(Session):
+    """Session that reads from one of `replicas` when they are assigned.
+
+    The replica is picked on the first statement, so sessions that never
+    query do not take a turn in the rotation. Flushes and DML go to the
+    primary, and the first write drops the replica so the rest of the
+    session reads its own changes.
+    """
+    replicas = None
+    _replica = None
+
+    def get_bind(self, mapper=None, *, clause=None, **kwargs):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.replicas = self._replica = None
+            self.info['wrote'] = True
+        elif self.replicas is not None:
+            if self._replica is None:
+                self._replica = self.replicas.choose()
+                if self._replica is None:
+                    self.replicas = None
+            if self._replica is not None:
+                return self._replica
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _remember_write(session):
+    if session.info.pop('wrote', False) and has_request_context():
+        g.db_wrote = True
+
+
+_engine = None
+_replicas = None
+_engine_lock = threading.Lock()
+_session_factory = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
 Base = declarative_base()
 
+def _create_engine(url, replica_urls=None):
+    global _engine, _replicas
+    if _engine is not None:
+        _engine.dispose()
+    if _replicas is not None:
+        _replicas.dispose()
+    _engine = create_engine(url, **_engine_options(url))
+    _replicas = ReplicaSet(replica_urls) if replica_urls else None
+    _session_factory.configure(bind=_engine)
+    return _engine
+
+def configure_engine(url=None, replica_urls=None):
+    """(Re)create the process-wide engines for `url` (DATABASE_URL by default) and its replicas"""
+    with _engine_lock:
+        if url is None:
+            url, replica_urls = DATABASE_URL, DATABASE_REPLICA_URLS
+        return _create_engine(url, replica_urls)
+
+def get_engine():
+    """Return the primary engine, creating it on first use so importing modules stays side-effect free"""
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _create_engine(DATABASE_URL, DATABASE_REPLICA_URLS)
+    return _engine
+
+def SessionLocal(replica=False):
+    """Open a session bound to the (lazily created) primary engine.
+
+    With `replica`, reads go to a replica when any is configured and healthy.
+    """
+    get_engine()
+    session = _session_factory()
+    if replica:
+        session.replicas = _replicas
+    return session
+
+def reset_after_fork():
+    """Drop pooled connections inherited from a parent process without closing them for it"""
+    if _engine is not None:
+        _engine.dispose(close=False)
+    if _replicas is not None:
+        _replicas.dispose(close=False)
+
+def read_from_primary():
+    """Send the current request's reads to the primary, e.g. right after a write elsewhere"""
+    g.read_primary = True
+
+def _request_can_use_replica():
+    return (request.method in READ_ONLY_METHODS
+            and not g.get('read_primary')
+            and READ_PRIMARY_COOKIE not in request.cookies)
+
 def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close() 
\ No newline at end of file
+    """Return the session for the current request, opening it on first use"""
+    if 'db' not in g:
+        g.db = SessionLocal(replica=_request_can_use_replica())
+    return g.db
+
+def close_db(exception=None):
+    """Roll back anything left uncommitted and return the connection to the pool"""
+    db = g.pop('db', None)
+    if db is not None:
+        if exception is not None:
+            db.rollback()
+        db.close()
+
+def _set_read_primary_cookie(response):
+    if g.pop('db_wrote', False) and _replicas is not None:
+        response.set_cookie(READ_PRIMARY_COOKIE, '1', max_age=READ_YOUR_WRITES_SECONDS,
+                            httponly=True, samesite='Lax')
+    return response
+
+def init_app(app):
+    app.after_request(_set_read_primary_cookie)
+    app.teardown_appcontext(close_db)
+
+def pool_status():
+    pool = get_engine().pool
+    status = {
+        'checkouts_total': pool_stats.checkouts,
+        'timeouts_total': pool_stats.timeouts,
+        'wait_seconds_total': round(pool_stats.wait_seconds_total, 6),
+        'wait_seconds_max': round(pool_stats.wait_seconds_max, 6),
+    }
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': max(pool.overflow(), 0),
+        })
+    if _replicas is not None:
+        status['replicas'] = _replicas.status()
+    return status
@@ -1,8 +1,24 @@
+import re
+from datetime import timezone
 from flask import request, jsonify
 from sqlalchemy.orm import Session
 from database import get_db
-from utils.helpers import decode_jwt
+from utils.helpers import decode_jwt_payload
+from utils import auth_cache
 from models.user import User
+from models.user_session import UserSession
+
+# Opaque session tokens issued before JWTs (secrets.token_hex(32)); see UserSession
+LEGACY_TOKEN = re.compile(r'[0-9a-f]{64}')
+
+def _verify_legacy_session(db, token):
+    """User id for a migrated legacy session token, cached until it expires"""
+    session = UserSession.lookup(db, token)
+    if session is None:
+        return None
+    expires_at = session.expires_at.replace(tzinfo=timezone.utc).timestamp()
+    auth_cache.remember_verified_token(token, str(session.user_id), expires_at)
+    return str(session.user_id)
 
 def get_current_user(db):
     auth_header = request.headers.get('Authorization')
@@ -10,10 +26,23 @@ def get_current_user(db):
         return None
 
     token = auth_header.split(' ')[1]
-    user_id = decode_jwt(token)
-    
+    user_id = auth_cache.get_verified_token(token)
     if not user_id:
-        return None
-        
+        payload = decode_jwt_payload(token)
+        if payload:
+            user_id = payload['sub']
+            auth_cache.remember_verified_token(token, user_id, payload['exp'])
+        elif LEGACY_TOKEN.fullmatch(token):
+            user_id = _verify_legacy_session(db, token)
+        if not user_id:
+            return None
+
+    # Cached snapshots come back as transient User objects, not bound to `db`
+    snapshot = auth_cache.get_user_snapshot(user_id)
+    if snapshot is not None:
+        return User(**snapshot)
+
     user = User.get_by_id(db, user_id)
-    return user 
\ No newline at end of file
+    if user:
+        auth_cache.remember_user(user)
+    return user
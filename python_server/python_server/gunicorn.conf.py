@@ -0,0 +1,71 @@
+"""Gunicorn settings for the API (gunicorn -c gunicorn.conf.py wsgi:app).
+
+The app is imported once in the master (preload) and forked into workers.
+Engine and background threads are created per worker in post_fork, so no
+database connection or thread is shared across processes. Run
+`python -m utils.data_initializer` once before starting. With
+PROMETHEUS_MULTIPROC_DIR set, /metrics aggregates every worker.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+# gthread: one worker per CPU, each serving GUNICORN_THREADS requests concurrently.
+# An open SSE stream holds a thread for as long as it lasts, so docker-compose runs
+# /api/notifications/stream on its own `stream` service (one worker, ~1000 threads)
+# and the API workers keep their few threads for short requests.
+# gevent needs `pip install gevent psycogreen` instead.
+# Each worker has its own pool of DB_POOL_SIZE + DB_MAX_OVERFLOW connections.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+preload_app = True
+# Long enough for bulk imports and streamed exports
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+
+
+def _process_local_backends():
+    """Settings whose state lives in one worker, so other workers never see its updates"""
+    from config import RESPONSE_CACHE_URL, NOTIFICATION_BROKER
+    backends = []
+    if RESPONSE_CACHE_URL.startswith('memory://'):
+        backends.append("RESPONSE_CACHE_URL=memory:// (a product write only invalidates the cached "
+                        "pages and ETags of the worker that handled it)")
+    if NOTIFICATION_BROKER == 'memory':
+        backends.append("NOTIFICATION_BROKER=memory (SSE subscribers only receive notifications "
+                        "created by their own worker)")
+    return backends
+
+
+def on_starting(server):
+    if server.cfg.workers > 1:
+        for backend in _process_local_backends():
+            server.log.warning("*** %d workers share no state with %s. Set a shared backend "
+                               "(redis:// / postgres) or GUNICORN_WORKERS=1. ***", server.cfg.workers, backend)
+    # Per-worker metric files from a previous run would be summed into /metrics
+    multiproc_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+        for name in os.listdir(multiproc_dir):
+            os.remove(os.path.join(multiproc_dir, name))
+
+
+def post_fork(server, worker):
+    from database import reset_after_fork
+    from app import start_background_workers
+    reset_after_fork()
+    start_background_workers()
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,40 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, Integer, BigInteger, JSON
+from database import Base
+
+class MigrationCheckpoint(Base):
+    """Progress of one resumable import, committed together with each batch it covers"""
+    __tablename__ = "migration_checkpoints"
+
+    name = Column(String, primary_key=True)
+    # Byte offset just past the last consumed entry, and how many entries that is
+    offset = Column(BigInteger, nullable=False, default=0)
+    records = Column(Integer, nullable=False, default=0)
+    written = Column(Integer, nullable=False, default=0)
+    skipped = Column(Integer, nullable=False, default=0)
+    # Source file signature plus whatever later steps need (e.g. remapped ids)
+    state = Column(JSON, nullable=True)
+    status = Column(String, nullable=False, default='running')
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    @staticmethod
+    def load(db, name):
+        """The checkpoint for `name`, added (uncommitted) at zero if there is none"""
+        checkpoint = db.get(MigrationCheckpoint, name)
+        if checkpoint is None:
+            checkpoint = MigrationCheckpoint(name=name, offset=0, records=0, written=0, skipped=0,
+                                             state={}, status='running', updated_at=datetime.utcnow())
+            db.add(checkpoint)
+        return checkpoint
+
+    def restart(self, state):
+        self.offset = self.records = self.written = self.skipped = 0
+        self.state = state
+        self.status = 'running'
+
+    def advance(self, offset, records, written, skipped):
+        self.offset = offset
+        self.records += records
+        self.written += written
+        self.skipped += skipped
+        self.updated_at = datetime.utcnow()
@@ -1,42 +1,236 @@
+import logging
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Boolean
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import (
+    Column, String, DateTime, Boolean, BigInteger, ForeignKey, Index, Uuid,
+    and_, event, exists, literal, select, tuple_, update, insert as sa_insert
+)
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import postgresql, sqlite
 from database import Base
+from utils.helpers import parse_uuid, encode_cursor
+from utils.notification_broker import broker
+
+TOTAL_COUNTER = 'total'
+
+
+def _row_to_dict(row):
+    """API representation of an (id, message, created_at, read_at) row"""
+    return {'id': row.id, 'message': row.message, 'read': row.read_at is not None, 'created_at': row.created_at}
+
+logger = logging.getLogger(__name__)
 
 class Notification(Base):
     __tablename__ = "notifications"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
     message = Column(String, nullable=False)
+    # Legacy global flag; read state is tracked per user in notification_reads
     read = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    def to_dict(self):
+    __table_args__ = (
+        Index('ix_notifications_created_at_id', 'created_at', 'id'),
+    )
+
+    def to_dict(self, read=None):
         return {
             'id': str(self.id),
             'message': self.message,
-            'read': self.read,
+            'read': self.read if read is None else read,
             'created_at': self.created_at.isoformat()
         }
 
     @staticmethod
-    def get_all(db):
-        return db.query(Notification).order_by(Notification.created_at.desc()).all()
-    
+    def _query_with_read_state(db, user_id):
+        """Plain (id, message, created_at, read_at) rows with the user's read state"""
+        return (
+            db.query(Notification.id, Notification.message, Notification.created_at, NotificationRead.read_at)
+            .outerjoin(NotificationRead, and_(
+                NotificationRead.notification_id == Notification.id,
+                NotificationRead.user_id == user_id
+            ))
+        )
+
+    @staticmethod
+    def get_page(db, user_id, per_page=20, cursor=None):
+        """Keyset page of notifications, newest first, with the user's read state.
+
+        Reads plain columns rather than Notification instances and returns
+        ([notification dict], next_cursor).
+        """
+        query = Notification._query_with_read_state(db, user_id)
+        if cursor:
+            query = query.filter(tuple_(Notification.created_at, Notification.id) < tuple(cursor))
+        rows = (
+            query.order_by(Notification.created_at.desc(), Notification.id.desc())
+            .limit(per_page + 1)
+            .all()
+        )
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+        return [_row_to_dict(row) for row in rows], next_cursor
+
+    def to_event(self):
+        """Payload for the live stream; the id doubles as a resume cursor"""
+        return {'id': encode_cursor(self.created_at, self.id), 'data': self.to_dict(read=False)}
+
+    @staticmethod
+    def get_since(db, cursor, limit=100):
+        """Notifications created after `cursor`, oldest first"""
+        return (
+            db.query(Notification)
+            .filter(tuple_(Notification.created_at, Notification.id) > tuple(cursor))
+            .order_by(Notification.created_at, Notification.id)
+            .limit(limit)
+            .all()
+        )
+
+    @staticmethod
+    def add(db, message):
+        """Add a notification to `db` without committing.
+
+        It is published to live subscribers once the transaction commits.
+        """
+        values = {'id': uuid.uuid4(), 'message': message, 'read': False, 'created_at': datetime.utcnow()}
+        db.execute(sa_insert(Notification.__table__).values(**values))
+        NotificationCounter.increment(db, TOTAL_COUNTER, 1)
+        # Transient, so it stays readable after the caller commits
+        new_notification = Notification(**values)
+        db.info.setdefault('notification_events', []).append(new_notification.to_event())
+        return new_notification
+
     @staticmethod
     def create(db, message):
-        new_notification = Notification(message=message)
-        db.add(new_notification)
+        new_notification = Notification.add(db, message)
         db.commit()
-        db.refresh(new_notification)
         return new_notification
 
     @staticmethod
-    def mark_as_read(db, notification_id):
-        notification = db.query(Notification).filter(Notification.id == notification_id).first()
-        if notification:
-            notification.read = True
+    def mark_as_read(db, user_id, notification_ids=None):
+        """Mark the given notifications (or all of them) read for a user.
+
+        Runs as a single INSERT ... SELECT that skips rows already read, and
+        returns how many notifications became read.
+        """
+        user_id = parse_uuid(user_id)
+        source = select(
+            literal(user_id, Uuid(as_uuid=True)),
+            Notification.id,
+            literal(datetime.utcnow(), DateTime)
+        ).where(~exists().where(and_(
+            NotificationRead.user_id == user_id,
+            NotificationRead.notification_id == Notification.id
+        )))
+        if notification_ids is not None:
+            ids = [parsed for parsed in map(parse_uuid, notification_ids) if parsed is not None]
+            if not ids:
+                return 0
+            source = source.where(Notification.id.in_(ids))
+
+        dialect = db.get_bind().dialect.name
+        insert = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}.get(dialect, sa_insert)
+        statement = insert(NotificationRead).from_select(
+            ['user_id', 'notification_id', 'read_at'], source
+        )
+        if dialect in ('postgresql', 'sqlite'):
+            # Concurrent requests for the same user may race past NOT EXISTS
+            statement = statement.on_conflict_do_nothing()
+        marked = db.execute(statement).rowcount
+        if marked:
+            NotificationCounter.increment(db, NotificationCounter.read_key(user_id), marked)
+        db.commit()
+        return marked
+
+    @staticmethod
+    def mark_one_as_read(db, user_id, notification_id):
+        """Mark one notification read; returns its dict, or None if it does not exist.
+
+        One SELECT fetches the notification with its read state, so an
+        already-read notification costs no write.
+        """
+        notification_id = parse_uuid(notification_id)
+        if notification_id is None:
+            return None
+        row = (
+            Notification._query_with_read_state(db, parse_uuid(user_id))
+            .filter(Notification.id == notification_id)
+            .first()
+        )
+        if row is None:
+            return None
+        if row.read_at is None:
+            Notification.mark_as_read(db, user_id, [notification_id])
+        return {**_row_to_dict(row), 'read': True}
+
+    @staticmethod
+    def unread_count(db, user_id):
+        counters = dict(
+            db.query(NotificationCounter.name, NotificationCounter.value)
+            .filter(NotificationCounter.name.in_([TOTAL_COUNTER, NotificationCounter.read_key(user_id)]))
+            .all()
+        )
+        return max(counters.get(TOTAL_COUNTER, 0) - counters.get(NotificationCounter.read_key(user_id), 0), 0)
+
+    @staticmethod
+    def ensure_counters(db):
+        """Seed the total counter from the table for databases created before it existed"""
+        if db.get(NotificationCounter, TOTAL_COUNTER) is None:
+            db.add(NotificationCounter(name=TOTAL_COUNTER, value=db.query(Notification).count()))
             db.commit()
-            db.refresh(notification)
-        return notification 
\ No newline at end of file
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_notifications(session):
+    for notification_event in session.info.pop('notification_events', []):
+        try:
+            broker.publish(notification_event)
+        except Exception:
+            # Live delivery is best effort; clients catch up via Last-Event-ID
+            logger.exception("Failed to publish notification %s", notification_event['id'])
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_notifications(session):
+    session.info.pop('notification_events', None)
+
+
+class NotificationRead(Base):
+    """Per-user read state: one row per notification a user has read"""
+    __tablename__ = "notification_reads"
+
+    user_id = Column(Uuid(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    notification_id = Column(Uuid(as_uuid=True), ForeignKey("notifications.id"), primary_key=True)
+    read_at = Column(DateTime, default=datetime.utcnow)
+
+
+class NotificationCounter(Base):
+    """Maintained counters so unread counts need no scan: unread = total - read:<user>"""
+    __tablename__ = "notification_counters"
+
+    name = Column(String, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+    @staticmethod
+    def read_key(user_id):
+        return f"read:{user_id}"
+
+    @staticmethod
+    def increment(db, name, amount):
+        dialect = db.get_bind().dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+            statement = insert(NotificationCounter).values(name=name, value=amount)
+            db.execute(statement.on_conflict_do_update(
+                index_elements=[NotificationCounter.name],
+                set_={'value': NotificationCounter.value + amount}
+            ))
+            return
+        updated = db.execute(
+            update(NotificationCounter)
+            .where(NotificationCounter.name == name)
+            .values(value=NotificationCounter.value + amount)
+        ).rowcount
+        if not updated:
+            db.add(NotificationCounter(name=name, value=amount))
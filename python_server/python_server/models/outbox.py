@@ -0,0 +1,102 @@
+import threading
+import uuid
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, Integer, JSON, Index, Uuid, delete, event, or_, select
+from sqlalchemy.orm import Session
+from database import Base
+
+# Set after a transaction that wrote outbox events commits, so an in-process
+# dispatcher can drain them right away instead of waiting for its next poll
+outbox_signal = threading.Event()
+
+class OutboxEvent(Base):
+    """Side effect recorded in the same transaction as the write that caused it"""
+    __tablename__ = "outbox_events"
+
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    event_type = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    available_at = Column(DateTime, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index('ix_outbox_events_pending', 'processed_at', 'available_at'),
+    )
+
+    @staticmethod
+    def add(db, event_type, payload):
+        """Queue an event on `db` without committing; it is written with the caller's transaction"""
+        outbox_event = OutboxEvent(event_type=event_type, payload=payload)
+        db.add(outbox_event)
+        db.info['outbox_written'] = True
+        return outbox_event
+
+    @staticmethod
+    def claim_batch(db, batch_size, max_attempts):
+        """Lock a batch of due events; other dispatchers skip rows already claimed.
+
+        SQLite has no row locks and pysqlite only opens a transaction before
+        DML, so the savepoint released after each handler would commit on its
+        own. There the batch starts with BEGIN IMMEDIATE instead: handlers and
+        the processed_at updates commit together, and other dispatchers wait
+        for the write lock rather than claim the same rows.
+        """
+        connection = db.connection()
+        if connection.dialect.name == 'sqlite' and not connection.connection.dbapi_connection.in_transaction:
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+        now = datetime.utcnow()
+        return (
+            db.query(OutboxEvent)
+            .filter(
+                OutboxEvent.processed_at.is_(None),
+                OutboxEvent.available_at <= now,
+                OutboxEvent.attempts < max_attempts
+            )
+            .order_by(OutboxEvent.available_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+    @staticmethod
+    def pending_count(db, max_attempts):
+        return db.query(OutboxEvent).filter(
+            OutboxEvent.processed_at.is_(None), OutboxEvent.attempts < max_attempts
+        ).count()
+
+    @staticmethod
+    def dead_count(db, max_attempts):
+        return db.query(OutboxEvent).filter(
+            OutboxEvent.processed_at.is_(None), OutboxEvent.attempts >= max_attempts
+        ).count()
+
+    @staticmethod
+    def purge_batch(db, processed_before, dead_before, max_attempts, batch_size):
+        """Delete up to `batch_size` processed or dead events older than the cutoffs, without committing"""
+        expired = (
+            select(OutboxEvent.id)
+            .where(or_(
+                OutboxEvent.processed_at < processed_before,
+                (OutboxEvent.processed_at.is_(None)) & (OutboxEvent.available_at < dead_before)
+                & (OutboxEvent.attempts >= max_attempts)
+            ))
+            .limit(batch_size)
+        )
+        ids = db.execute(expired).scalars().all()
+        if ids:
+            db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(ids)))
+        return len(ids)
+
+
+@event.listens_for(Session, 'after_commit')
+def _signal_outbox(session):
+    if session.info.pop('outbox_written', False):
+        outbox_signal.set()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_outbox_flag(session):
+    session.info.pop('outbox_written', None)
@@ -1,23 +1,154 @@
+import csv
+import io
 import uuid
+import time
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Float, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, DateTime, Float, ForeignKey, Index, Uuid, insert, select, text, tuple_
 from sqlalchemy.orm import relationship
 from database import Base
+from config import PRODUCT_COUNT_CACHE_TTL, API_URL, IMAGE_VARIANT_WIDTHS
+from utils.helpers import parse_uuid, encode_cursor
+from utils.search import apply_product_search, deferred_search_index
+from utils.response_cache import bump_catalog_version
+from utils import suggest
+from models.outbox import OutboxEvent
+from models.user import User
+
+# Cached COUNT(*) results keyed by search query and filters: {(query, filters): (total, computed_at)}
+_count_cache = {}
+_COUNT_CACHE_MAX_KEYS = 1024
+
+# Columns read by the list endpoints, which serialize rows without building ORM objects
+_LIST_COLUMNS = ('id', 'name', 'description', 'price', 'image_url', 'created_at', 'created_by')
+
+# Fields a client may request with `fields=`; image_variants is derived from image_url
+PRODUCT_FIELDS = _LIST_COLUMNS[:5] + ('image_variants',) + _LIST_COLUMNS[5:]
+
+# Public columns of a product's creator, embedded by batch lookups with include=creator
+_CREATOR_COLUMNS = ('id', 'name', 'profile_image')
+
+# Column order of the COPY / executemany rows written by bulk_insert
+_COPY_COLUMNS = ('id', 'name', 'description', 'price', 'image_url', 'created_at', 'created_by')
+
+# `sort=` values: (column, descending). The id breaks ties in the same direction, so
+# each order (and its keyset cursor) walks one of the (column, id) indexes below.
+PRODUCT_SORTS = {
+    'created_at': ('created_at', False),
+    '-created_at': ('created_at', True),
+    'price': ('price', False),
+    '-price': ('price', True),
+    'name': ('name', False),
+    '-name': ('name', True),
+}
+DEFAULT_CURSOR_SORT = '-created_at'
+
+
+def _parse_text(value):
+    if not isinstance(value, str):
+        raise TypeError('Expected a string')
+    return value
+
+
+# How the sort value stored in a cursor is read back, per sort column
+CURSOR_PARSERS = {
+    'created_at': datetime.fromisoformat,
+    'price': float,
+    'name': _parse_text,
+}
+
+
+def invalidate_catalog():
+    """Drop cached counts and cached catalog responses after a write"""
+    _count_cache.clear()
+    bump_catalog_version()
+
+
+def image_variants(image_url):
+    """Resized URLs keyed by width, for images hosted by this server"""
+    if not image_url or not image_url.startswith(f"{API_URL}/images/"):
+        return {}
+    return {str(width): f"{image_url}?w={width}" for width in IMAGE_VARIANT_WIDTHS}
+
+
+def _columns_for(fields, required=()):
+    """Columns to select for a sparse fieldset, in table order"""
+    if fields is None:
+        return _LIST_COLUMNS
+    wanted = set(fields) | set(required)
+    if 'image_variants' in wanted:
+        wanted.add('image_url')
+    return tuple(name for name in _LIST_COLUMNS if name in wanted)
+
+
+def _apply_filters(query, filters):
+    """Narrow a list query by the validated `filters` dict (min_price, max_price, created_after, created_by)"""
+    if not filters:
+        return query
+    if filters.get('min_price') is not None:
+        query = query.filter(Product.price >= filters['min_price'])
+    if filters.get('max_price') is not None:
+        query = query.filter(Product.price <= filters['max_price'])
+    if filters.get('created_after') is not None:
+        query = query.filter(Product.created_at > filters['created_after'])
+    if filters.get('created_by') is not None:
+        query = query.filter(Product.created_by == filters['created_by'])
+    return query
+
+
+def _order_by(sort):
+    column_name, descending = PRODUCT_SORTS[sort]
+    column = Product.__table__.c[column_name]
+    return (column.desc(), Product.id.desc()) if descending else (column.asc(), Product.id.asc())
+
+
+def row_to_dict(row, fields=None):
+    """API representation of a list query row; the JSON provider encodes UUIDs and datetimes.
+
+    With `fields`, the row holds only the columns those fields need and only
+    they are returned.
+    """
+    if fields is not None:
+        record = dict(zip(row._fields, row))
+        if 'image_variants' in fields:
+            record['image_variants'] = image_variants(record['image_url'])
+        return {field: record[field] for field in fields}
+    # Unpacking is several times cheaper than Row attribute lookups
+    id, name, description, price, image_url, created_at, created_by = row
+    return {
+        'id': id,
+        'name': name,
+        'description': description,
+        'price': price,
+        'image_url': image_url,
+        'image_variants': image_variants(image_url),
+        'created_at': created_at,
+        'created_by': created_by
+    }
 
 class Product(Base):
     __tablename__ = "products"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    name = Column(String, index=True)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    name = Column(String)
     description = Column(String)
     price = Column(Float)
     image_url = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
-    created_by = Column(UUID(as_uuid=True), ForeignKey("users.id"))
+    created_by = Column(Uuid(as_uuid=True), ForeignKey("users.id"))
 
     creator = relationship("User")
 
+    __table_args__ = (
+        # Backs keyset pagination ordered by (created_at, id) and created_after
+        Index('ix_products_created_at_id', 'created_at', 'id'),
+        # sort=price / sort=name (either direction) and min_price / max_price ranges
+        Index('ix_products_price_id', 'price', 'id'),
+        Index('ix_products_name_id', 'name', 'id'),
+        # created_by=, newest first or by price
+        Index('ix_products_created_by_created_at_id', 'created_by', 'created_at', 'id'),
+        Index('ix_products_created_by_price_id', 'created_by', 'price', 'id'),
+    )
+
     def to_dict(self):
         return {
             'id': str(self.id),
@@ -25,39 +156,246 @@ class Product(Base):
             'description': self.description,
             'price': self.price,
             'image_url': self.image_url,
+            'image_variants': image_variants(self.image_url),
             'created_at': self.created_at.isoformat(),
-            'created_by': str(self.created_by)
+            'created_by': str(self.created_by) if self.created_by else None
         }
 
     @staticmethod
-    def get_all(db, page=1, per_page=10, search_query=None):
-        query = db.query(Product)
+    def list_query(db, fields=None, required=()):
+        """Query for the list endpoints: plain column rows instead of Product instances.
+
+        `fields` narrows the SELECT list to what those fields need, plus `required`.
+        """
+        return db.query(*(Product.__table__.c[name] for name in _columns_for(fields, required)))
+
+    @staticmethod
+    def get_all(db, page=1, per_page=10, search_query=None, fields=None, filters=None, sort=None):
+        """Offset page of products; without `sort`, search results come by relevance"""
+        query = _apply_filters(Product.list_query(db, fields), filters)
         if search_query:
-            query = query.filter(Product.name.ilike(f"%{search_query}%"))
-        
-        total = query.count()
+            query = apply_product_search(db, query, search_query, ranked=sort is None)
+
+        total = query.order_by(None).count()
+        if sort:
+            query = query.order_by(*_order_by(sort))
         products = query.offset((page - 1) * per_page).limit(per_page).all()
         
         return {
-            "products": [p.to_dict() for p in products],
+            "products": [row_to_dict(p, fields) for p in products],
             "total": total,
             "pages": (total + per_page - 1) // per_page
         }
 
+    @staticmethod
+    def get_page(db, per_page=10, cursor=None, search_query=None, total_mode=None, fields=None,
+                 filters=None, sort=DEFAULT_CURSOR_SORT):
+        """Keyset pagination over (sort column, id), newest first by default.
+
+        `cursor` is a decoded (sort value, id) pair from the previous page.
+        `total_mode` is None (no total), 'exact' (cached COUNT) or 'estimate'.
+        """
+        column_name, descending = PRODUCT_SORTS[sort]
+        column = Product.__table__.c[column_name]
+        # The next cursor is built from (sort column, id) whatever fields were asked for
+        query = _apply_filters(Product.list_query(db, fields, required=('id', column_name)), filters)
+        if search_query:
+            query = apply_product_search(db, query, search_query)
+        if cursor:
+            key = tuple_(column, Product.id)
+            query = query.filter(key < tuple(cursor) if descending else key > tuple(cursor))
+
+        # Fetch one extra row to know whether there is a next page
+        products = query.order_by(*_order_by(sort)).limit(per_page + 1).all()
+        has_more = len(products) > per_page
+        products = products[:per_page]
+
+        last = products[-1] if has_more else None
+        result = {
+            "products": [row_to_dict(p, fields) for p in products],
+            "next_cursor": encode_cursor(getattr(last, column_name), last.id) if has_more else None
+        }
+        if total_mode == 'exact':
+            result["total"] = Product.count(db, search_query, filters)
+        elif total_mode == 'estimate':
+            result["total"] = Product.estimate_count(db, search_query, filters)
+        return result
+
+    @staticmethod
+    def count(db, search_query=None, filters=None):
+        """Exact product count, cached for PRODUCT_COUNT_CACHE_TTL seconds"""
+        key = (search_query or '', tuple(sorted((filters or {}).items())))
+        now = time.monotonic()
+        cached = _count_cache.get(key)
+        if cached and now - cached[1] < PRODUCT_COUNT_CACHE_TTL:
+            return cached[0]
+
+        query = _apply_filters(db.query(Product), filters)
+        if search_query:
+            query = apply_product_search(db, query, search_query)
+        total = query.count()
+
+        if len(_count_cache) >= _COUNT_CACHE_MAX_KEYS:
+            _count_cache.clear()
+        _count_cache[key] = (total, now)
+        return total
+
+    @staticmethod
+    def estimate_count(db, search_query=None, filters=None):
+        """Planner row estimate on PostgreSQL, cached exact count elsewhere"""
+        if not search_query and not filters and db.get_bind().dialect.name == 'postgresql':
+            estimate = db.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE relname = :table"),
+                {"table": Product.__tablename__}
+            ).scalar()
+            # reltuples is -1 until the table has been vacuumed/analyzed
+            if estimate is not None and estimate >= 0:
+                return estimate
+        return Product.count(db, search_query, filters)
+
     @staticmethod
     def get_by_id(db, product_id):
+        product_id = parse_uuid(product_id)
+        if product_id is None:
+            return None
         return db.query(Product).filter(Product.id == product_id).first()
 
     @staticmethod
-    def create(db, name, description, price, image_url, created_by):
-        new_product = Product(
-            name=name,
-            description=description,
-            price=price,
-            image_url=image_url,
-            created_by=created_by
-        )
-        db.add(new_product)
+    def get_fields_by_id(db, product_id, fields):
+        """Only the requested fields of one product, selecting just their columns"""
+        product_id = parse_uuid(product_id)
+        if product_id is None:
+            return None
+        row = Product.list_query(db, fields).filter(Product.id == product_id).first()
+        return row_to_dict(row, fields) if row else None
+
+    @staticmethod
+    def get_many(db, product_ids, fields=None, include_creator=False):
+        """Look up several products with one IN query; returns (products in request order, missing ids).
+
+        Repeated ids are returned once. With `include_creator`, each product's
+        `creator` is read in the same query through an outer join, rather than
+        one lazy `Product.creator` load per row.
+        """
+        requested = {product_id: parse_uuid(product_id) for product_id in product_ids}
+        wanted = {value for value in requested.values() if value is not None}
+        rows = {}
+        if wanted:
+            # Rows carry extra creator columns, so they go through the by-name path of row_to_dict
+            fields = fields or (PRODUCT_FIELDS if include_creator else None)
+            query = Product.list_query(db, fields, required=('id',)).filter(Product.id.in_(wanted))
+            if include_creator:
+                query = query.outerjoin(User, User.id == Product.created_by).add_columns(
+                    *(User.__table__.c[name].label(f'creator_{name}') for name in _CREATOR_COLUMNS)
+                )
+            rows = {row.id: row for row in query}
+
+        products, missing = [], []
+        for product_id, value in requested.items():
+            row = rows.get(value)
+            if row is None:
+                missing.append(product_id)
+                continue
+            product = row_to_dict(row, fields)
+            if include_creator:
+                product['creator'] = {
+                    name: getattr(row, f'creator_{name}') for name in _CREATOR_COLUMNS
+                } if row.creator_id is not None else None
+            products.append(product)
+        return products, missing
+
+    @staticmethod
+    def create(db, name, description, price, image_url, created_by, notify=False):
+        """Insert a product with INSERT ... RETURNING; with `notify`, its side effects go through the outbox in the same commit"""
+        values = {
+            'id': uuid.uuid4(),
+            'name': name,
+            'description': description,
+            'price': price,
+            'image_url': image_url,
+            'created_at': datetime.utcnow(),
+            'created_by': created_by
+        }
+        statement = insert(Product.__table__).values(**values)
+        if db.get_bind().dialect.insert_returning:
+            values = db.execute(statement.returning(*Product.__table__.c)).mappings().one()
+        else:
+            db.execute(statement)
+        if notify:
+            OutboxEvent.add(db, 'product.created', {'product_id': str(values['id']), 'name': name})
         db.commit()
-        db.refresh(new_product)
-        return new_product 
\ No newline at end of file
+        invalidate_catalog()
+        suggest.add(values['id'], name)
+        # Transient: built from the written row, so nothing is reloaded after the commit
+        return Product(**values)
+
+    @staticmethod
+    def bulk_insert(db, rows, created_by=None):
+        """Insert validated rows in one statement (COPY on PostgreSQL) without committing.
+
+        Rows may carry their own `id`, `created_at` and `created_by`; otherwise a
+        random id, the current time and `created_by` are used.
+        """
+        if not rows:
+            return 0
+        dialect = db.get_bind().dialect
+        now = datetime.utcnow()
+
+        if dialect.name == 'postgresql':
+            buffer = io.StringIO()
+            # Quoted "" stays an empty string; COPY reads bare empty fields as NULL
+            writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+            writer.writerows(
+                (str(row.get('id') or uuid.uuid4()), row['name'], row['description'], row['price'],
+                 row['image_url'], row.get('created_at', now).isoformat(),
+                 str(row.get('created_by', created_by)))
+                for row in rows
+            )
+            buffer.seek(0)
+            raw_connection = db.connection().connection.driver_connection
+            with raw_connection.cursor() as cursor:
+                cursor.copy_expert(
+                    f"COPY {Product.__tablename__} ({', '.join(_COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                    buffer
+                )
+        elif dialect.name == 'sqlite':
+            # Plain tuples straight to executemany, with the shared values converted once;
+            # per-row statement processing would otherwise cost more than the insert
+            process_id = Product._bind_processor('id', dialect)
+            process_datetime = Product._bind_processor('created_at', dialect)
+            now_value = process_datetime(now)
+            created_by_value = process_id(created_by) if created_by else None
+            params = [
+                (process_id(row.get('id') or uuid.uuid4()), row['name'], row['description'], row['price'],
+                 row['image_url'],
+                 process_datetime(row['created_at']) if 'created_at' in row else now_value,
+                 process_id(row['created_by']) if 'created_by' in row else created_by_value)
+                for row in rows
+            ]
+            placeholders = ', '.join('?' for _ in _COPY_COLUMNS)
+            with deferred_search_index(db):
+                db.connection().exec_driver_sql(
+                    f"INSERT INTO {Product.__tablename__} ({', '.join(_COPY_COLUMNS)}) VALUES ({placeholders})",
+                    params
+                )
+        else:
+            db.execute(insert(Product.__table__), [
+                {'id': uuid.uuid4(), 'created_at': now, 'created_by': created_by, **row}
+                for row in rows
+            ])
+        return len(rows)
+
+    @staticmethod
+    def _bind_processor(column, dialect):
+        column_type = Product.__table__.c[column].type
+        return column_type.dialect_impl(dialect).bind_processor(dialect) or (lambda value: value)
+
+    @staticmethod
+    def iter_export(db, batch_size=1000):
+        """Stream product rows (columns only) from a server-side cursor"""
+        statement = (
+            select(*(Product.__table__.c[name] for name in _LIST_COLUMNS))
+            .order_by(Product.created_at, Product.id)
+            .execution_options(yield_per=batch_size)
+        )
+        yield from db.execute(statement) 
\ No newline at end of file
@@ -0,0 +1,47 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, Integer, JSON
+from sqlalchemy.exc import IntegrityError
+from database import Base
+
+class SeedRun(Base):
+    """Marker row claimed by the one process allowed to seed a dataset"""
+    __tablename__ = "seed_runs"
+
+    name = Column(String, primary_key=True)
+    seed = Column(Integer, nullable=True)
+    params = Column(JSON, nullable=True)
+    status = Column(String, nullable=False, default='running')
+    started_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+    @staticmethod
+    def claim(db, name, seed=None, params=None):
+        """Insert the marker; returns False if another process already claimed `name`"""
+        db.add(SeedRun(name=name, seed=seed, params=params, status='running', started_at=datetime.utcnow()))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return False
+        return True
+
+    @staticmethod
+    def finish(db, name, status='done'):
+        seed_run = db.get(SeedRun, name)
+        seed_run.status = status
+        seed_run.finished_at = datetime.utcnow()
+        db.commit()
+
+    @staticmethod
+    def resume(db, name):
+        """Take over a run that failed part way; returns its marker, or None if there is none to resume"""
+        resumed = db.query(SeedRun).filter(SeedRun.name == name, SeedRun.status == 'failed') \
+            .update({'status': 'running', 'finished_at': None}, synchronize_session=False)
+        db.commit()
+        return db.get(SeedRun, name) if resumed else None
+
+    @staticmethod
+    def release(db, name):
+        """Drop the marker so a failed or stale run can be retried"""
+        db.query(SeedRun).filter(SeedRun.name == name).delete()
+        db.commit()
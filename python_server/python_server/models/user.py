@@ -1,14 +1,21 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, DateTime, Uuid, insert, select, update
 from database import Base
-from utils.helpers import hash_password
+from utils.helpers import parse_uuid
+from utils.passwords import hash_password
+from utils.auth_cache import invalidate_user, remember_user
+from utils.response_cache import bump_catalog_version
+
+# Columns a user may change through PUT /profile; anything else in the body is ignored
+UPDATABLE_FIELDS = ('name', 'email', 'phone', 'profile_image')
+# Columns embedded in catalog responses as the product creator (include=creator)
+CREATOR_FIELDS = ('name', 'profile_image')
 
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, index=True)
     email = Column(String, unique=True, index=True)
     password = Column(String)
@@ -36,29 +43,71 @@ class User(Base):
 
     @staticmethod
     def get_by_id(db, user_id):
+        user_id = parse_uuid(user_id)
+        if user_id is None:
+            return None
         return db.query(User).filter(User.id == user_id).first()
 
     @staticmethod
     def create(db, name, email, password, phone, profile_image):
-        hashed_pw = hash_password(password)
-        new_user = User(
-            name=name, 
-            email=email, 
-            password=hashed_pw, 
-            phone=phone, 
-            profile_image=profile_image
+        """Insert a user and return it without a refresh SELECT.
+
+        A duplicate email raises IntegrityError from the unique index, and a
+        saturated hashing pool raises PasswordHashingBusy before any write.
+        """
+        values = {
+            'id': uuid.uuid4(),
+            'name': name,
+            'email': email,
+            'password': hash_password(password),
+            'phone': phone,
+            'profile_image': profile_image,
+            'created_at': datetime.utcnow()
+        }
+        statement = insert(User.__table__).values(**values)
+        if db.get_bind().dialect.insert_returning:
+            values = db.execute(statement.returning(*User.__table__.c)).mappings().one()
+        else:
+            db.execute(statement)
+        db.commit()
+        # Transient, like the auth cache snapshots: nothing left to load after the commit
+        return User(**values)
+
+    @staticmethod
+    def replace_password_hash(db, user_id, old_hash, new_hash):
+        """Store an upgraded hash unless the password changed since `old_hash` was read"""
+        db.execute(
+            update(User.__table__)
+            .where(User.id == user_id, User.password == old_hash)
+            .values(password=new_hash)
         )
-        db.add(new_user)
         db.commit()
-        db.refresh(new_user)
-        return new_user
+        invalidate_user(user_id)
 
     @staticmethod
     def update(db, user_id, data):
-        user = User.get_by_id(db, user_id)
-        if user:
-            for key, value in data.items():
-                setattr(user, key, value)
-            db.commit()
-            db.refresh(user)
-        return user 
\ No newline at end of file
+        """Update the whitelisted fields in `data` with one UPDATE ... RETURNING"""
+        user_id = parse_uuid(user_id)
+        if user_id is None:
+            return None
+        values = {key: data[key] for key in UPDATABLE_FIELDS if key in data}
+        if not values:
+            return User.get_by_id(db, user_id)
+
+        statement = update(User.__table__).where(User.id == user_id).values(**values)
+        if db.get_bind().dialect.update_returning:
+            row = db.execute(statement.returning(*User.__table__.c)).mappings().first()
+        else:
+            matched = db.execute(statement).rowcount
+            row = db.execute(select(User.__table__).where(User.id == user_id)).mappings().first() if matched else None
+        db.commit()
+        if row is None:
+            invalidate_user(user_id)
+            return None
+        if any(key in values for key in CREATOR_FIELDS):
+            # Cached catalog responses may embed this user as a product creator
+            bump_catalog_version()
+        user = User(**row)
+        # The written row is the fresh snapshot, so the next request needs no SELECT
+        remember_user(user)
+        return user
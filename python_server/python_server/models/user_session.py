@@ -0,0 +1,40 @@
+import hashlib
+from datetime import datetime, timedelta
+from sqlalchemy import Column, String, DateTime, ForeignKey, Uuid, delete, select
+from database import Base
+
+# Lifetime of the opaque session tokens issued before JWTs, as sessions.json enforced it
+SESSION_TTL = timedelta(hours=24)
+
+class UserSession(Base):
+    """Opaque session token migrated from the legacy sessions.json store.
+
+    Only the SHA-256 digest of a token is stored, so checking one is a single
+    primary-key lookup and a leaked table does not leak usable tokens.
+    """
+    __tablename__ = "user_sessions"
+
+    token_hash = Column(String(64), primary_key=True)
+    user_id = Column(Uuid(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    @staticmethod
+    def hash_token(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @staticmethod
+    def lookup(db, token):
+        """(user_id, expires_at) of a live session for `token`, or None"""
+        return db.execute(
+            select(UserSession.user_id, UserSession.expires_at)
+            .where(UserSession.token_hash == UserSession.hash_token(token))
+            .where(UserSession.expires_at > datetime.utcnow())
+        ).first()
+
+    @staticmethod
+    def delete_expired(db):
+        """Drop expired sessions; returns how many were removed"""
+        removed = db.execute(delete(UserSession).where(UserSession.expires_at <= datetime.utcnow())).rowcount
+        db.commit()
+        return removed
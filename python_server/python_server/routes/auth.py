@@ -6,11 +6,11 @@ auth_bp = Blueprint('auth_bp', __name__)
 
 @auth_bp.route('/register', methods=['POST'])
 def register():
-    return auth_controller.register(db=next(get_db()))
+    return auth_controller.register(db=get_db())
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
-    return auth_controller.login(db=next(get_db()))
+    return auth_controller.login(db=get_db())
 
 @auth_bp.route('/logout', methods=['POST'])
 def logout():
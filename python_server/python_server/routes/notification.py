@@ -7,12 +7,30 @@ notification_bp = Blueprint('notification_bp', __name__)
 
 @notification_bp.route('/notifications', methods=['GET'])
 def get_notifications():
-    db_session = next(get_db())
+    db_session = get_db()
     current_user = get_current_user(db=db_session)
     return notification_controller.get_notifications(db=db_session, current_user=current_user)
 
+@notification_bp.route('/notifications/stream', methods=['GET'])
+def stream_notifications():
+    db_session = get_db()
+    current_user = get_current_user(db=db_session)
+    return notification_controller.stream_notifications(db=db_session, current_user=current_user)
+
+@notification_bp.route('/notifications/unread-count', methods=['GET'])
+def get_unread_count():
+    db_session = get_db()
+    current_user = get_current_user(db=db_session)
+    return notification_controller.get_unread_count(db=db_session, current_user=current_user)
+
+@notification_bp.route('/notifications/read', methods=['PUT'])
+def mark_notifications_read():
+    db_session = get_db()
+    current_user = get_current_user(db=db_session)
+    return notification_controller.mark_notifications_read(db=db_session, current_user=current_user)
+
 @notification_bp.route('/notifications/<notification_id>/read', methods=['PUT'])
 def mark_notification_read(notification_id):
-    db_session = next(get_db())
+    db_session = get_db()
     current_user = get_current_user(db=db_session)
-    return notification_controller.mark_notification_read(notification_id=notification_id, db=db_session, current_user=current_user) 
\ No newline at end of file
+    return notification_controller.mark_notification_read(notification_id=notification_id, db=db_session, current_user=current_user)
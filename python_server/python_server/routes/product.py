@@ -2,25 +2,49 @@ from flask import Blueprint
 from controllers import product_controller
 from database import get_db
 from dependencies import get_current_user
+from utils.response_cache import catalog_cached
 
 product_bp = Blueprint('product_bp', __name__)
 
 @product_bp.route('/products', methods=['GET'])
+@catalog_cached(args=('page', 'limit', 'search', 'cursor', 'total', 'fields', 'sort',
+                      'min_price', 'max_price', 'created_after', 'created_by', 'ids', 'include'))
 def get_products():
-    return product_controller.get_products(db=next(get_db()))
+    return product_controller.get_products(db=get_db())
+
+@product_bp.route('/products/export', methods=['GET'])
+def export_products():
+    db_session = get_db()
+    current_user = get_current_user(db=db_session)
+    return product_controller.export_products(db=db_session, current_user=current_user)
+
+@product_bp.route('/products/batch', methods=['POST'])
+def get_products_batch():
+    return product_controller.get_products_batch(db=get_db())
+
+@product_bp.route('/products/suggest', methods=['GET'])
+def suggest_products():
+    return product_controller.suggest_products()
 
 @product_bp.route('/products/<product_id>', methods=['GET'])
+@catalog_cached(args=('fields',))
 def get_product(product_id):
-    return product_controller.get_product(product_id=product_id, db=next(get_db()))
+    return product_controller.get_product(product_id=product_id, db=get_db())
 
 @product_bp.route('/products', methods=['POST'])
 def create_product():
-    db_session = next(get_db())
+    db_session = get_db()
     current_user = get_current_user(db=db_session)
     return product_controller.create_product(db=db_session, current_user=current_user)
 
+@product_bp.route('/products/bulk', methods=['POST'])
+def bulk_import_products():
+    db_session = get_db()
+    current_user = get_current_user(db=db_session)
+    return product_controller.bulk_import_products(db=db_session, current_user=current_user)
+
 @product_bp.route('/upload-image', methods=['POST'])
 def upload_image():
-    db_session = next(get_db())
+    db_session = get_db()
     current_user = get_current_user(db=db_session)
     return product_controller.upload_image(current_user=current_user) 
\ No newline at end of file
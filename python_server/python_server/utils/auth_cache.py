@@ -0,0 +1,44 @@
+"""Per-process caches for authentication.
+
+`token_cache` maps a raw JWT to its already-verified (user_id, exp) so the
+HMAC check runs once per token, and `user_cache` maps a user id to a
+snapshot of its columns so authenticated requests skip `User.get_by_id`.
+Entries are invalidated explicitly when a user changes; the TTL bounds how
+long other replicas can serve a stale snapshot.
+"""
+import time
+from config import AUTH_CACHE_SIZE, AUTH_CACHE_TTL
+from utils.cache import TTLCache
+
+token_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+user_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+
+def get_verified_token(token):
+    """Return the cached user id for a token whose signature was already verified"""
+    entry = token_cache.get(token)
+    if entry is None:
+        return None
+    user_id, expires_at = entry
+    if expires_at <= time.time():
+        token_cache.delete(token)
+        return None
+    return user_id
+
+def remember_verified_token(token, user_id, expires_at):
+    remaining = expires_at - time.time()
+    if remaining > 0:
+        token_cache.set(token, (user_id, expires_at), ttl=min(AUTH_CACHE_TTL, remaining))
+
+def get_user_snapshot(user_id):
+    return user_cache.get(str(user_id))
+
+def remember_user(user):
+    user_cache.set(str(user.id), {
+        column.name: getattr(user, column.name) for column in user.__table__.columns
+    })
+
+def invalidate_user(user_id):
+    user_cache.delete(str(user_id))
+
+def stats():
+    return {'tokens': token_cache.stats(), 'users': user_cache.stats()}
@@ -0,0 +1,111 @@
+"""Streaming NDJSON/CSV readers and writers for product import/export.
+
+Records are parsed one line at a time from the request body, so an import
+never holds more than one insert batch in memory; exports are produced row
+by row from a server-side cursor.
+"""
+import csv
+import io
+import json
+import math
+
+FORMATS = ('ndjson', 'csv')
+EXPORT_FIELDS = ('id', 'name', 'description', 'price', 'image_url', 'created_at', 'created_by')
+MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def detect_format(mimetype, requested=None):
+    """Pick the import/export format from an explicit `format` value or a mimetype"""
+    if requested:
+        return requested if requested in FORMATS else None
+    if mimetype in ('text/csv', 'application/csv'):
+        return 'csv'
+    if mimetype in ('application/x-ndjson', 'application/jsonl', 'application/json-lines', 'application/json'):
+        return 'ndjson'
+    return None
+
+
+def validate_record(record):
+    """Return (values, error) for one import record"""
+    if not isinstance(record, dict):
+        return None, 'Record must be an object'
+    name = record.get('name')
+    if not isinstance(name, str) or not name.strip():
+        return None, 'Missing required field: name'
+    try:
+        price = float(record.get('price'))
+    except (TypeError, ValueError):
+        return None, 'Invalid price'
+    if not math.isfinite(price) or price < 0:
+        return None, 'Invalid price'
+    return {
+        'name': name.strip(),
+        'description': record.get('description') or '',
+        'price': price,
+        'image_url': record.get('image_url') or '',
+    }, None
+
+
+def read_records(stream, fmt):
+    """Yield (line_number, record, error) from a binary stream"""
+    text = io.TextIOWrapper(stream, encoding='utf-8', errors='replace', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        if reader.fieldnames is None:
+            return
+        for record in reader:
+            # DictReader puts extra cells under the None key
+            record.pop(None, None)
+            yield reader.line_num, record, None
+        return
+
+    for line_number, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_number, json.loads(line), None
+        except ValueError:
+            yield line_number, None, 'Invalid JSON'
+
+
+def export_row(row):
+    return {
+        'id': str(row.id),
+        'name': row.name,
+        'description': row.description,
+        'price': row.price,
+        'image_url': row.image_url,
+        'created_at': row.created_at.isoformat() if row.created_at else None,
+        'created_by': str(row.created_by) if row.created_by else None,
+    }
+
+
+def write_records(rows, fmt, chunk_rows=500):
+    """Yield encoded chunks of `chunk_rows` exported rows"""
+    buffer = io.StringIO()
+    writer = None
+    if fmt == 'csv':
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, lineterminator='\n')
+        writer.writeheader()
+
+    pending = 0
+    for row in rows:
+        record = export_row(row)
+        if writer:
+            writer.writerow(record)
+        else:
+            buffer.write(json.dumps(record))
+            buffer.write('\n')
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
@@ -0,0 +1,69 @@
+"""Negotiated gzip/brotli compression of text responses.
+
+Responses of at least COMPRESSION_MIN_BYTES with a compressible mimetype are
+encoded with the best encoding the client accepts: brotli (when the Brotli
+package is installed) or gzip. Streamed and file responses are left alone.
+Cached catalog responses carry precompressed bodies (see response_cache), so
+they are compressed once per cache entry rather than once per request.
+
+Strong ETags become weak once a body is encoded, as nginx does, so that
+conditional requests still match whichever encoding the client received.
+"""
+import gzip
+from flask import request
+from config import COMPRESSION_MIN_BYTES, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv', 'text/html', 'text/plain'}
+
+# In order of preference when the client accepts several with the same quality
+ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def compress_all(data):
+    """Every supported encoding of `data`, or {} when it is below the size threshold"""
+    if len(data) < COMPRESSION_MIN_BYTES:
+        return {}
+    return {encoding: compress(data, encoding) for encoding in ENCODINGS}
+
+
+def negotiate(available=ENCODINGS):
+    """Best of `available` for the current request's Accept-Encoding, or None for identity"""
+    return request.accept_encodings.best_match(available)
+
+
+def apply_encoding(response, encoding, body):
+    """Send `body`, already encoded with `encoding`, in place of the response body"""
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def compress_response(response):
+    if (response.direct_passthrough or response.is_streamed
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    if (response.status_code != 200 or 'Content-Encoding' in response.headers
+            or response.calculate_content_length() < COMPRESSION_MIN_BYTES):
+        return response
+    encoding = negotiate()
+    if encoding:
+        apply_encoding(response, encoding, compress(response.get_data(), encoding))
+    return response
+
+
+def init_app(app):
+    app.after_request(compress_response)
@@ -1,57 +1,58 @@
-from models.user import User
-from models.product import Product
-from models.notification import Notification
-from database import SessionLocal, engine, Base
-import uuid
-from datetime import datetime, timedelta
+"""Schema creation and sample data, run once per deployment before serving:
+    python -m utils.data_initializer
+"""
+import logging
+from contextlib import contextmanager
+from sqlalchemy import text
+from database import get_engine, Base
+from utils.search import setup_search_index
+from utils import seeder
+# Tables not reached through the seeder's imports
+import models.user_session  # noqa: F401
+import models.migration_checkpoint  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key shared by every process that runs schema changes
+SCHEMA_LOCK_KEY = 7310021
+# Indexes made redundant by wider ones, dropped from databases created before
+SUPERSEDED_INDEXES = (
+    'ix_products_name',  # leading column of ix_products_name_id
+)
+
+@contextmanager
+def schema_lock(engine):
+    """Serialise DDL across processes with a PostgreSQL advisory lock (no-op elsewhere)"""
+    if engine.dialect.name != 'postgresql':
+        yield
+        return
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SCHEMA_LOCK_KEY})
 
 def create_tables():
-    Base.metadata.create_all(bind=engine)
+    engine = get_engine()
+    with schema_lock(engine):
+        Base.metadata.create_all(bind=engine)
+        # create_all skips indexes on tables that already exist
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=engine, checkfirst=True)
+        with engine.begin() as conn:
+            for name in SUPERSEDED_INDEXES:
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        setup_search_index(engine)
 
 def initialize_sample_data():
-    """Initialize with sample products and users"""
-    db = SessionLocal()
-    
-    # Check if data already exists
-    if db.query(User).first() or db.query(Product).first():
-        db.close()
-        return
+    """Seed the small sample dataset (admin user, 100 products, 6 notifications) once per database"""
+    seeder.seed_database(sample=True)
 
-    # Sample admin user
-    admin_user = User.create(
-        db=db,
-        name='Admin User',
-        email='admin@example.com',
-        password='admin123',
-        phone='+1234567890',
-        profile_image='https://picsum.photos/150/150?random=admin'
-    )
 
-    # Sample products
-    for i in range(1, 101):
-        Product.create(
-            db=db,
-            name=f'Product {i}',
-            description=f'This is a sample product {i} with detailed description.',
-            price=round(10.99 + (i * 2.5), 2),
-            image_url=f'https://picsum.photos/300/300?random={i}',
-            created_by=admin_user.id
-        )
-    
-    # Sample notifications
-    sample_notifications = [
-        'Welcome to Product App! Your account has been created successfully.',
-        'New product "Product 50" has been added to the catalog.',
-        'Your profile has been updated successfully.',
-        'System maintenance scheduled for tomorrow at 2 AM.',
-        'You have 5 new products in your catalog.',
-        'Don\'t forget to check out the latest features!'
-    ]
-    
-    for message in sample_notifications:
-        Notification.create(
-            db=db,
-            message=message
-        )
-    
-    db.close() 
\ No newline at end of file
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(message)s')
+    create_tables()
+    initialize_sample_data()
+    logger.info("Schema ready and sample data seeded")
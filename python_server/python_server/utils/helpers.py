@@ -1,47 +1,22 @@
 import json
-import os
-import hashlib
 import secrets
 import base64
+import binascii
+import io
 import uuid
 import jwt
-from datetime import datetime, timedelta
-from config import (
-    DATA_DIR, IMAGES_DIR, USERS_FILE, PRODUCTS_FILE, SESSIONS_FILE, NOTIFICATIONS_FILE, SECRET_KEY
-)
-
-def load_data(filename):
-    """Load data from JSON file"""
-    if os.path.exists(filename):
-        with open(filename, 'r') as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return {}
-    return {}
-
-def save_data(filename, data):
-    """Save data to JSON file"""
-    with open(filename, 'w') as f:
-        json.dump(data, f, indent=2)
-
-def hash_password(password):
-    """Hash password using SHA-256"""
-    return hashlib.sha256(password.encode()).hexdigest()
+from datetime import datetime, timedelta, timezone
+from config import SECRET_KEY
 
 def generate_session_token():
     """Generate a secure session token"""
     return secrets.token_hex(32)
 
-def is_valid_session(token):
-    """Check if session token is valid"""
-    sessions = load_data(SESSIONS_FILE)
-    if token in sessions:
-        session = sessions[token]
-        created_at = datetime.fromisoformat(session['created_at'])
-        if datetime.now() - created_at < timedelta(hours=24):
-            return session['user_id']
-    return None
+def is_valid_session(db, token):
+    """Return the user id of a live legacy session token, or None"""
+    from models.user_session import UserSession
+    session = UserSession.lookup(db, token)
+    return session.user_id if session else None
 
 def create_jwt(user_id):
     """Create a new JWT for a user"""
@@ -52,32 +27,76 @@ def create_jwt(user_id):
     }
     return jwt.encode(payload, SECRET_KEY, algorithm='HS256')
 
-def decode_jwt(token):
-    """Decode and validate a JWT"""
+def decode_jwt_payload(token):
+    """Decode and validate a JWT, returning its claims"""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
-        return payload['sub']
+        return jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
     except jwt.ExpiredSignatureError:
         return None # Signature has expired
     except jwt.InvalidTokenError:
         return None # Invalid token
 
-def save_base64_image(base64_string, filename):
-    """Save base64 encoded image to file"""
+def decode_jwt(token):
+    """Decode and validate a JWT"""
+    payload = decode_jwt_payload(token)
+    return payload['sub'] if payload else None
+
+def parse_uuid(value):
+    """Parse a UUID from a string, returning None if it is malformed"""
+    if isinstance(value, uuid.UUID):
+        return value
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+def parse_datetime(value):
+    """Parse an ISO 8601 timestamp into naive UTC (how timestamps are stored), or None if malformed"""
     try:
-        if ',' in base64_string:
-            base64_string = base64_string.split(',')[1]
-        
-        image_data = base64.b64decode(base64_string)
-        
-        filepath = os.path.join(IMAGES_DIR, filename)
-        with open(filepath, 'wb') as f:
-            f.write(image_data)
-        
-        return filepath
-    except Exception as e:
-        print(f"Error saving image: {e}")
+        parsed = datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith('Z') else value)
+    except ValueError:
         return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def encode_cursor(value, item_id):
+    """Build an opaque pagination cursor from a (sort value, id) pair, e.g. (created_at, id)"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, str(item_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor, parse=datetime.fromisoformat):
+    """Decode a pagination cursor whose sort value `parse` reads, returning None if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, item_id = json.loads(raw)
+        return parse(value), uuid.UUID(item_id)
+    except (ValueError, TypeError):
+        return None
+
+def parse_fields(value, allowed):
+    """Parse a comma-separated `fields=` list, returning None if it names an unknown field"""
+    fields = tuple(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    if not fields or any(field not in allowed for field in fields):
+        return None
+    return fields
+
+def save_base64_image(base64_string):
+    """Save a base64 encoded image (optionally a data: URL); returns (filename, deduplicated)"""
+    from utils.image_store import UploadError, save_stream
+
+    if not isinstance(base64_string, str):
+        raise UploadError('Image data must be a base64 string')
+    if ',' in base64_string:
+        base64_string = base64_string.split(',', 1)[1]
+    try:
+        image_data = base64.b64decode(base64_string, validate=True)
+    except (binascii.Error, ValueError):
+        raise UploadError('Invalid base64 image data')
+
+    return save_stream(io.BytesIO(image_data))
 
 def add_notification(db, message):
     """Add a new notification"""
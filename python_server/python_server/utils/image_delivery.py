@@ -0,0 +1,41 @@
+"""Delivery of stored images with long-lived caching.
+
+Upload names are UUIDs or content hashes and variant names are derived
+from them, so a URL never changes content and responses are marked
+`immutable`. With IMAGE_DELIVERY=x-accel the worker only validates the
+path and answers with an X-Accel-Redirect header; nginx then serves the
+file itself (sendfile, Range, conditional requests) from an internal
+location. Otherwise Flask's send_file is used, which supports Range and
+conditional requests and hands the file to the WSGI server's
+`wsgi.file_wrapper` (sendfile under gunicorn) when available.
+"""
+import mimetypes
+import os
+from flask import Response, abort, send_from_directory
+from werkzeug.security import safe_join
+from config import IMAGES_DIR, IMAGE_DELIVERY, IMAGE_ACCEL_PREFIX
+
+MAX_AGE = 365 * 24 * 60 * 60
+
+
+def _immutable(response):
+    response.cache_control.public = True
+    response.cache_control.max_age = MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
+
+def send_image(directory, filename):
+    """Send `filename` from `directory` (IMAGES_DIR or a subdirectory of it)"""
+    # Dot files are never served (staging directories, editor or OS leftovers)
+    path = safe_join(directory, filename) if not filename.startswith('.') else None
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    if IMAGE_DELIVERY == 'x-accel':
+        relative = os.path.relpath(path, IMAGES_DIR).replace(os.sep, '/')
+        response = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = IMAGE_ACCEL_PREFIX + relative
+        return _immutable(response)
+
+    return _immutable(send_from_directory(directory, filename, max_age=MAX_AGE))
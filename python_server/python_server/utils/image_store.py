@@ -0,0 +1,91 @@
+"""Content-addressed storage for uploaded images.
+
+Uploads are read in fixed-size chunks into a temporary file in
+IMAGES_DIR/.staging while being hashed, then atomically renamed to
+`<sha256>.<ext>`. Identical content therefore maps to one file, memory use
+does not grow with the image size, and readers never see a partial file.
+The staging directory sits inside IMAGES_DIR so the rename stays on one
+filesystem (IMAGES_DIR is often a mounted volume), and /images/<filename>
+cannot reach into it.
+"""
+import hashlib
+import os
+import tempfile
+from config import IMAGES_DIR, IMAGE_MAX_BYTES
+
+CHUNK_SIZE = 64 * 1024
+SNIFF_BYTES = 12
+STAGING_DIR = os.path.join(IMAGES_DIR, '.staging')
+
+# Leading bytes of the image formats we accept, and the extension stored
+_SIGNATURES = [
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+]
+
+
+class UploadError(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def sniff_image_type(head):
+    """Return the file extension for the image format in `head`, or None"""
+    for signature, extension in _SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def save_stream(stream, max_bytes=IMAGE_MAX_BYTES):
+    """Store an image read from a file-like `stream`.
+
+    Returns (filename, deduplicated). Raises UploadError if the stream is
+    empty, larger than `max_bytes` or not a supported image format.
+    """
+    os.makedirs(STAGING_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+
+    # Read enough leading bytes to recognise the format before writing anything
+    head = b''
+    while len(head) < SNIFF_BYTES:
+        chunk = stream.read(SNIFF_BYTES - len(head))
+        if not chunk:
+            break
+        head += chunk
+    if not head:
+        raise UploadError('Image data is required')
+    extension = sniff_image_type(head)
+    if extension is None:
+        raise UploadError('Unsupported image type', 415)
+
+    fd, temp_path = tempfile.mkstemp(dir=STAGING_DIR, prefix='upload-')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            chunk = head
+            while chunk:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadError(f'Image exceeds the {max_bytes} byte limit', 413)
+                digest.update(chunk)
+                temp_file.write(chunk)
+                chunk = stream.read(CHUNK_SIZE)
+
+        filename = f"{digest.hexdigest()}.{extension}"
+        final_path = os.path.join(IMAGES_DIR, filename)
+        if os.path.exists(final_path):
+            os.remove(temp_path)
+            return filename, True
+        os.replace(temp_path, final_path)
+        return filename, False
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -0,0 +1,120 @@
+"""Resized image variants (thumbnails), rendered on a process pool.
+
+A variant of `images/<name>` is stored as `images/variants/<stem>-<width>.<format>`.
+It is rendered the first time it is requested (or pre-warmed right after an
+upload) and served from disk afterwards. Rendering happens in a
+ProcessPoolExecutor so resizing never holds the GIL of a request worker.
+Requires Pillow; without it callers fall back to the original image.
+"""
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from config import IMAGES_DIR, IMAGE_VARIANT_WIDTHS, IMAGE_WORKERS, IMAGE_RENDER_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = os.path.join(IMAGES_DIR, 'variants')
+FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+
+try:
+    import PIL  # noqa: F401
+    AVAILABLE = True
+except ImportError:
+    AVAILABLE = False
+
+_executor = None
+_in_flight = {}
+# Re-entrant: a done-callback may run inline while _submit holds the lock
+_lock = threading.RLock()
+
+
+def render_variant(source_path, dest_path, width, fmt):
+    """Resize `source_path` to at most `width` pixels wide; runs in a pool process"""
+    from PIL import Image
+
+    with Image.open(source_path) as image:
+        image.thumbnail((width, width * 10), Image.LANCZOS)
+        if fmt == 'jpeg' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(dest_path), prefix='.variant-')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                image.save(out, FORMATS[fmt], quality=80, optimize=True)
+            os.replace(temp_path, dest_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+    return dest_path
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+        return _executor
+
+
+def closest_width(requested):
+    """Snap a requested width to the smallest configured variant that is at least as wide"""
+    for width in IMAGE_VARIANT_WIDTHS:
+        if width >= requested:
+            return width
+    return IMAGE_VARIANT_WIDTHS[-1]
+
+
+def variant_name(filename, width, fmt):
+    stem = os.path.splitext(filename)[0]
+    return f"{stem}-{width}.{'jpg' if fmt == 'jpeg' else fmt}"
+
+
+def _submit(filename, width, fmt):
+    """Start rendering a variant unless it exists or is already being rendered"""
+    name = variant_name(filename, width, fmt)
+    dest_path = os.path.join(VARIANTS_DIR, name)
+    with _lock:
+        future = _in_flight.get(name)
+        if future is None and not os.path.exists(dest_path):
+            os.makedirs(VARIANTS_DIR, exist_ok=True)
+            future = _get_executor().submit(
+                render_variant, os.path.join(IMAGES_DIR, filename), dest_path, width, fmt
+            )
+            _in_flight[name] = future
+            future.add_done_callback(lambda _: _forget(name))
+    return name, future
+
+
+def _forget(name):
+    with _lock:
+        _in_flight.pop(name, None)
+
+
+def get_variant(filename, width, fmt='jpeg'):
+    """Return the variant's file name inside VARIANTS_DIR, rendering it if needed.
+
+    Returns None when the variant cannot be produced, in which case the
+    original should be served.
+    """
+    if not AVAILABLE or fmt not in FORMATS:
+        return None
+    if not os.path.isfile(os.path.join(IMAGES_DIR, filename)):
+        return None
+    name, future = _submit(filename, closest_width(width), fmt)
+    if future is not None:
+        try:
+            future.result(timeout=IMAGE_RENDER_TIMEOUT)
+        except Exception:
+            logger.exception("Rendering %s failed", name)
+            return None
+    return name
+
+
+def prewarm(filename):
+    """Queue every configured variant of a freshly uploaded image without waiting"""
+    if not AVAILABLE:
+        return
+    for width in IMAGE_VARIANT_WIDTHS:
+        for fmt in FORMATS:
+            _submit(filename, width, fmt)
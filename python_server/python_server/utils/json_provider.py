@@ -0,0 +1,47 @@
+"""orjson-backed JSON provider for Flask.
+
+orjson encodes UUIDs, datetimes and dataclasses natively, so views can hand
+database rows to jsonify without converting every field to a string first.
+Naive datetimes come out exactly as `datetime.isoformat()` writes them;
+non-ASCII text is written as UTF-8 rather than \\u escapes.
+"""
+import decimal
+import orjson
+from flask.json.provider import JSONProvider
+
+
+def _default(obj):
+    # Types orjson leaves to the caller, handled like Flask's default provider
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(JSONProvider):
+    # Same key order as Flask's default provider, so cached bodies and ETags stay stable
+    sort_keys = True
+    # None: indented in debug mode only
+    compact = None
+    mimetype = 'application/json'
+
+    def _options(self, indent=False):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        body = orjson.dumps(obj, default=_default, option=self._options(indent))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
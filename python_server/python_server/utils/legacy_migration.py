@@ -0,0 +1,404 @@
+"""Import the legacy JSON stores (data/*.json) into the database.
+
+Each store is one JSON object keyed by id. It is parsed incrementally, one
+entry at a time, so memory stays flat however large the file is, and the
+entries are upserted in batches. Every batch commits together with a
+checkpoint holding the byte offset reached, so an interrupted run resumes
+where it stopped; re-running a finished import is a no-op unless the file
+changed (or --restart is given), and upserts keep re-imported entries from
+duplicating.
+
+Users whose email already exists under another id (e.g. the seeded admin)
+are merged into that user, and their products and sessions follow. Product
+owners that are not users, like the legacy "system", become NULL.
+
+    python -m utils.legacy_migration --data-dir data --batch-size 1000
+"""
+import argparse
+import codecs
+import json
+import logging
+import math
+import os
+import re
+import time
+from datetime import datetime
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from database import SessionLocal
+from config import DATA_DIR, LEGACY_MIGRATION_BATCH_SIZE
+from models.user import User
+from models.product import Product, invalidate_catalog
+from models.notification import Notification, NotificationCounter, TOTAL_COUNTER
+from models.user_session import UserSession, SESSION_TTL
+from models.migration_checkpoint import MigrationCheckpoint
+from utils.helpers import parse_uuid
+
+logger = logging.getLogger(__name__)
+
+# In dependency order: products and sessions refer to users
+SOURCES = ('users', 'products', 'notifications', 'sessions')
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class ObjectReader:
+    """Incremental reader of the entries of a top-level JSON object in a binary file.
+
+    `offset` is the byte position just past the last entry yielded; passing
+    it back to `items` continues from there.
+    """
+
+    def __init__(self, stream, chunk_size=CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.offset = 0
+
+    def _fill(self):
+        """Append the next chunk to the buffer; False at the end of the file"""
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.chunk_size)
+        self.eof = not chunk
+        self.buffer = self.buffer[self.pos:] + self.decoder.decode(chunk, final=self.eof)
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        """Next non-whitespace character, or '' at the end of the file"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} but found {found or 'end of file'!r} near byte {self._tell()}")
+        self.pos += 1
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Incomplete in this chunk; a real syntax error is raised once the file is exhausted
+                if not self._fill():
+                    raise
+                continue
+            # A number or literal cut at the chunk boundary may continue in the next one
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def _tell(self):
+        """Byte offset of the parse position: bytes read minus what is still buffered"""
+        pending, _ = self.decoder.getstate()
+        return self.stream.tell() - len(pending) - len(self.buffer[self.pos:].encode('utf-8'))
+
+    def items(self, offset=0):
+        """Yield (key, value) pairs, starting after the entry that ends at `offset` if given"""
+        self.stream.seek(offset)
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer, self.pos, self.eof = '', 0, False
+        if offset == 0:
+            if self._peek() == '':
+                return
+            self._expect('{')
+            if self._peek() == '}':
+                return
+        elif self._peek() == '}':
+            return
+        else:
+            self._expect(',')
+        while True:
+            key = self._value()
+            if not isinstance(key, str):
+                raise ValueError(f"Expected a string key near byte {self._tell()}")
+            self._expect(':')
+            value = self._value()
+            self.offset = self._tell()
+            yield key, value
+            if self._peek() == '}':
+                return
+            self._expect(',')
+
+
+def upsert(db, model, rows):
+    """Insert `rows`, overwriting the columns of rows whose primary key already exists"""
+    table = model.__table__
+    key = [column.name for column in table.primary_key]
+    dialect = db.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        statement = insert(table)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=key,
+            set_={name: statement.excluded[name] for name in rows[0] if name not in key}
+        ), rows)
+    else:
+        for row in rows:
+            db.merge(model(**row))
+
+
+def _timestamp(value):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return datetime.utcnow()
+
+
+def _existing_user_ids(db, user_ids):
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return set()
+    return set(db.scalars(select(User.id).where(User.id.in_(user_ids))))
+
+
+def _resolve_user(user_id, remap):
+    user_id = parse_uuid(user_id)
+    if user_id is None:
+        return None
+    return parse_uuid(remap.get(str(user_id), user_id))
+
+
+def map_users(db, entries, remap):
+    """Rows for new or known users; a user whose email belongs to another id is added to `remap`"""
+    candidates = {}
+    for key, value in entries:
+        user_id = parse_uuid(value.get('id', key)) if isinstance(value, dict) else None
+        email = value.get('email') if user_id else None
+        if not isinstance(email, str) or not email:
+            continue
+        if email in candidates:
+            remap[str(user_id)] = str(candidates[email]['id'])
+            continue
+        candidates[email] = {
+            'id': user_id,
+            'name': value.get('name'),
+            'email': email,
+            'password': value.get('password'),
+            'phone': value.get('phone'),
+            'profile_image': value.get('profile_image'),
+            'created_at': _timestamp(value.get('created_at')),
+        }
+    if candidates:
+        for existing_id, email in db.execute(select(User.id, User.email).where(User.email.in_(candidates))):
+            if existing_id != candidates[email]['id']:
+                remap[str(candidates.pop(email)['id'])] = str(existing_id)
+        # A duplicate may point at a user that was just merged itself
+        for legacy_id, target in remap.items():
+            remap[legacy_id] = remap.get(target, target)
+    return list(candidates.values())
+
+
+def map_products(db, entries, remap):
+    rows = []
+    for key, value in entries:
+        if not isinstance(value, dict) or not isinstance(value.get('name'), str):
+            continue
+        product_id = parse_uuid(value.get('id', key))
+        try:
+            price = float(value.get('price'))
+        except (TypeError, ValueError):
+            continue
+        if product_id is None or not math.isfinite(price):
+            continue
+        rows.append({
+            'id': product_id,
+            'name': value['name'],
+            'description': value.get('description') or '',
+            'price': price,
+            'image_url': value.get('image_url') or '',
+            'created_at': _timestamp(value.get('created_at')),
+            'created_by': _resolve_user(value.get('created_by'), remap),
+        })
+    known = _existing_user_ids(db, (row['created_by'] for row in rows))
+    for row in rows:
+        if row['created_by'] not in known:
+            row['created_by'] = None
+    return rows
+
+
+def map_notifications(db, entries, remap):
+    rows = []
+    for key, value in entries:
+        notification_id = parse_uuid(value.get('id', key)) if isinstance(value, dict) else None
+        if notification_id is None or not isinstance(value.get('message'), str):
+            continue
+        rows.append({
+            'id': notification_id,
+            'message': value['message'],
+            'read': bool(value.get('read')),
+            'created_at': _timestamp(value.get('created_at')),
+        })
+    return rows
+
+
+def map_sessions(db, entries, remap):
+    """Live sessions only, keyed by token digest; the owner must exist"""
+    now = datetime.utcnow()
+    rows = []
+    for token, value in entries:
+        if not isinstance(value, dict):
+            continue
+        created_at = _timestamp(value.get('created_at'))
+        if created_at + SESSION_TTL <= now:
+            continue
+        rows.append({
+            'token_hash': UserSession.hash_token(token),
+            'user_id': _resolve_user(value.get('user_id'), remap),
+            'created_at': created_at,
+            'expires_at': created_at + SESSION_TTL,
+        })
+    known = _existing_user_ids(db, (row['user_id'] for row in rows))
+    return [row for row in rows if row['user_id'] in known]
+
+
+def finish_products(db):
+    invalidate_catalog()
+
+
+def finish_notifications(db):
+    """Bring the maintained total in line with the imported rows"""
+    total = db.scalar(select(func.count()).select_from(Notification))
+    counter = db.get(NotificationCounter, TOTAL_COUNTER)
+    if counter is None:
+        db.add(NotificationCounter(name=TOTAL_COUNTER, value=total))
+    else:
+        counter.value = total
+    db.commit()
+
+
+def finish_sessions(db):
+    UserSession.delete_expired(db)
+
+
+MIGRATIONS = {
+    'users': (User, map_users, None),
+    'products': (Product, map_products, finish_products),
+    'notifications': (Notification, map_notifications, finish_notifications),
+    'sessions': (UserSession, map_sessions, finish_sessions),
+}
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def _user_remap(db):
+    """Legacy user ids merged into existing users, recorded by the users import"""
+    checkpoint = db.get(MigrationCheckpoint, "legacy:users")
+    return dict((checkpoint.state or {}).get('remap', {})) if checkpoint else {}
+
+
+def migrate_source(db, name, path, batch_size=LEGACY_MIGRATION_BATCH_SIZE, restart=False):
+    """Import one store from `path`, resuming from its checkpoint; returns the checkpoint"""
+    model, map_batch, finish = MIGRATIONS[name]
+    checkpoint = MigrationCheckpoint.load(db, f"legacy:{name}")
+    signature = _signature(path)
+    if restart or (checkpoint.state or {}).get('file') != signature:
+        if checkpoint.records:
+            logger.info("%s: %s, starting over", name, 'restart requested' if restart else 'file changed')
+        checkpoint.restart({'file': signature})
+        db.commit()
+    elif checkpoint.status == 'done':
+        logger.info("%s: already imported (%d records), skipping", name, checkpoint.records)
+        return checkpoint
+    elif checkpoint.records:
+        logger.info("%s: resuming after %d records (byte %d)", name, checkpoint.records, checkpoint.offset)
+
+    remap = _user_remap(db)
+    started = time.perf_counter()
+    imported = 0
+    batch = []
+    with open(path, 'rb') as stream:
+        reader = ObjectReader(stream)
+
+        def flush():
+            rows = map_batch(db, batch, remap)
+            if rows:
+                upsert(db, model, rows)
+            if name == 'users':
+                # Reassigned rather than mutated so the JSON column is written
+                checkpoint.state = {**checkpoint.state, 'remap': dict(remap)}
+            checkpoint.advance(reader.offset, len(batch), len(rows), len(batch) - len(rows))
+            db.commit()
+            elapsed = time.perf_counter() - started
+            logger.info("%s: %d records (%.0f%%), %d written, %d skipped, %.0f records/s", name,
+                        checkpoint.records, 100 * reader.offset / max(signature['size'], 1),
+                        checkpoint.written, checkpoint.skipped, imported / elapsed if elapsed else 0)
+            batch.clear()
+
+        for entry in reader.items(checkpoint.offset):
+            batch.append(entry)
+            imported += 1
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+
+    if finish:
+        finish(db)
+    checkpoint.status = 'done'
+    db.commit()
+    return checkpoint
+
+
+def migrate(data_dir=DATA_DIR, sources=SOURCES, batch_size=LEGACY_MIGRATION_BATCH_SIZE, restart=False):
+    """Import each of `sources` found in `data_dir`, in dependency order; returns their checkpoints' counts"""
+    db = SessionLocal()
+    summary = {}
+    try:
+        Notification.ensure_counters(db)
+        for name in SOURCES:
+            path = os.path.join(data_dir, f'{name}.json')
+            if name not in sources:
+                continue
+            if not os.path.exists(path):
+                logger.info("%s: %s not found, skipping", name, path)
+                continue
+            checkpoint = migrate_source(db, name, path, batch_size, restart)
+            summary[name] = {'records': checkpoint.records, 'written': checkpoint.written,
+                             'skipped': checkpoint.skipped}
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data-dir', default=DATA_DIR, help='directory holding users.json, products.json, ...')
+    parser.add_argument('--only', default=','.join(SOURCES), help='comma-separated subset of ' + ', '.join(SOURCES))
+    parser.add_argument('--batch-size', type=int, default=LEGACY_MIGRATION_BATCH_SIZE)
+    parser.add_argument('--restart', action='store_true', help='ignore checkpoints and import everything again')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(message)s')
+
+    sources = [name.strip() for name in args.only.split(',') if name.strip()]
+    unknown = set(sources) - set(SOURCES)
+    if unknown:
+        parser.error(f"unknown sources: {', '.join(sorted(unknown))}")
+
+    from utils.data_initializer import create_tables
+    create_tables()
+    started = time.perf_counter()
+    summary = migrate(args.data_dir, sources, args.batch_size, args.restart)
+    for name, counts in summary.items():
+        logger.info("%s: %d records, %d written, %d skipped", name, counts['records'], counts['written'],
+                    counts['skipped'])
+    logger.info("Legacy import finished in %.1fs", time.perf_counter() - started)
+
+
+if __name__ == '__main__':
+    main()
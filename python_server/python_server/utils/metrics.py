@@ -0,0 +1,167 @@
+"""Per-request metrics exposed on /metrics in Prometheus text format.
+
+Every request is timed and labelled with its method, route rule and status
+code; SQL statements and time spent in the database are collected through
+SQLAlchemy engine events for the request's thread. Requests slower than
+METRICS_SLOW_REQUEST_SECONDS are counted and logged.
+
+With several worker processes set PROMETHEUS_MULTIPROC_DIR to an empty,
+writable directory shared by the workers; /metrics then aggregates them all
+(gunicorn.conf.py clears it on start and marks exited workers dead).
+
+/metrics and the other operational endpoints decorated with `ops_only`
+answer only clients in OPS_ALLOWED_NETWORKS (loopback by default).
+
+With PROFILING_ENABLED, a request carrying `X-Profile: 1` is run under
+cProfile and answered with the profile instead of its body
+(`X-Profile: pyinstrument` uses pyinstrument when it is installed).
+"""
+import cProfile
+import io
+import ipaddress
+import logging
+import pstats
+import time
+from functools import wraps
+from flask import Response, abort, g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess, REGISTRY
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from config import METRICS_SLOW_REQUEST_SECONDS, PROFILING_ENABLED, PROMETHEUS_MULTIPROC_DIR, OPS_ALLOWED_NETWORKS
+
+logger = logging.getLogger(__name__)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency by route and status',
+    ['method', 'route', 'status']
+)
+REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries', 'SQL statements executed per request',
+    ['method', 'route'], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, float('inf'))
+)
+REQUEST_DB_SECONDS = Histogram(
+    'http_request_db_duration_seconds', 'Time spent executing SQL per request',
+    ['method', 'route']
+)
+SLOW_REQUESTS = Counter(
+    'http_slow_requests_total', 'Requests slower than METRICS_SLOW_REQUEST_SECONDS',
+    ['method', 'route']
+)
+
+# Endpoints that are not worth measuring
+_SKIPPED_ENDPOINTS = {'metrics', 'static'}
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'metrics_started' in g:
+        g.sql_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'sql_started' in g:
+        g.sql_queries += 1
+        g.sql_seconds += time.perf_counter() - g.pop('sql_started')
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule else '<unmatched>'
+
+
+def _start_request():
+    if request.endpoint in _SKIPPED_ENDPOINTS:
+        return
+    g.metrics_started = time.perf_counter()
+    g.sql_queries = 0
+    g.sql_seconds = 0.0
+    mode = request.headers.get('X-Profile')
+    if PROFILING_ENABLED and mode and mode != '0':
+        _start_profile(mode)
+
+
+def _record_request(response):
+    if 'metrics_started' not in g:
+        return response
+    elapsed = time.perf_counter() - g.metrics_started
+    method, route = request.method, _route()
+    REQUEST_LATENCY.labels(method, route, str(response.status_code)).observe(elapsed)
+    REQUEST_DB_QUERIES.labels(method, route).observe(g.sql_queries)
+    REQUEST_DB_SECONDS.labels(method, route).observe(g.sql_seconds)
+    if elapsed >= METRICS_SLOW_REQUEST_SECONDS:
+        SLOW_REQUESTS.labels(method, route).inc()
+        logger.warning("Slow request %s %s: %.3fs, %d SQL statements (%.3fs in the database)",
+                       method, request.full_path.rstrip('?'), elapsed, g.sql_queries, g.sql_seconds)
+    if 'profiler' in g:
+        return _profile_response(response, elapsed)
+    return response
+
+
+def _start_profile(mode):
+    if mode == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            Profiler = None
+        if Profiler is not None:
+            g.profiler = Profiler()
+            g.profiler.start()
+            return
+    g.profiler = cProfile.Profile()
+    g.profiler.enable()
+
+
+def _profile_response(response, elapsed):
+    profiler = g.pop('profiler')
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(40)
+        report = output.getvalue()
+    else:
+        profiler.stop()
+        report = profiler.output_text(unicode=True)
+    summary = (f"{request.method} {request.full_path.rstrip('?')} -> {response.status_code} "
+               f"in {elapsed * 1000:.1f} ms, {g.sql_queries} SQL statements "
+               f"({g.sql_seconds * 1000:.1f} ms in the database)\n\n")
+    profiled = Response(summary + report, mimetype='text/plain')
+    profiled.headers['X-Profile-Status'] = str(response.status_code)
+    profiled.headers['Cache-Control'] = 'no-store'
+    return profiled
+
+
+_ops_networks = [ipaddress.ip_network(network.strip()) for network in OPS_ALLOWED_NETWORKS.split(',') if network.strip()]
+
+
+def ops_only(view):
+    """Answer 404 unless the client address is in OPS_ALLOWED_NETWORKS"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            address = ipaddress.ip_address(request.remote_addr or '')
+        except ValueError:
+            abort(404)
+        if not any(address in network for network in _ops_networks):
+            abort(404)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@ops_only
+def metrics_response():
+    """Render every metric, aggregated across worker processes when running multiprocess"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    # CONTENT_TYPE_LATEST already carries its charset; mimetype= would append a second one
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def init_app(app):
+    app.before_request(_start_request)
+    app.after_request(_record_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_response)
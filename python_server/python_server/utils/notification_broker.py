@@ -0,0 +1,125 @@
+"""Fan-out of new notifications to Server-Sent Events subscribers.
+
+`InProcessBroker` delivers to subscribers of the current process only.
+`PostgresBroker` publishes through LISTEN/NOTIFY so every replica's
+subscribers receive events, whichever replica created the notification.
+Select with NOTIFICATION_BROKER=memory|postgres. A broker only needs
+publish(event) and subscribe()/unsubscribe(subscription), so another
+pub/sub transport can be dropped in the same way.
+"""
+import json
+import logging
+import queue
+import select
+import threading
+import time
+from sqlalchemy import text
+from config import NOTIFICATION_BROKER, NOTIFICATION_STREAM_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'notifications'
+
+
+class Subscription:
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize=maxsize)
+        # Set when the subscriber fell too far behind; the stream then ends and
+        # the client reconnects with Last-Event-ID to catch up from the database
+        self.overflowed = False
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class InProcessBroker:
+    def __init__(self, queue_size=NOTIFICATION_STREAM_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        subscription = Subscription(self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event):
+        self.deliver(event)
+
+    def deliver(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(event)
+            except queue.Full:
+                subscription.overflowed = True
+
+
+class PostgresBroker(InProcessBroker):
+    def __init__(self, engine=None, queue_size=NOTIFICATION_STREAM_QUEUE_SIZE):
+        super().__init__(queue_size)
+        self._engine = engine
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from database import get_engine
+            return get_engine()
+        return self._engine
+
+    def publish(self, event):
+        with self.engine.begin() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                         {'channel': CHANNEL, 'payload': json.dumps(event)})
+
+    def subscribe(self):
+        with self._listener_lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='notification-listener', daemon=True)
+                self._listener.start()
+        return super().subscribe()
+
+    def _listen(self):
+        while True:
+            try:
+                # Detached so the long-lived LISTEN connection does not hold a pool slot
+                connection = self.engine.raw_connection()
+                connection.detach()
+                dbapi_connection = connection.driver_connection
+                dbapi_connection.autocommit = True
+                dbapi_connection.cursor().execute(f"LISTEN {CHANNEL}")
+                while True:
+                    if select.select([dbapi_connection], [], [], 5) == ([], [], []):
+                        continue
+                    dbapi_connection.poll()
+                    while dbapi_connection.notifies:
+                        notify = dbapi_connection.notifies.pop(0)
+                        self.deliver(json.loads(notify.payload))
+            except Exception:
+                logger.exception("Notification listener failed, reconnecting")
+                time.sleep(1)
+
+
+def create_broker():
+    if NOTIFICATION_BROKER == 'postgres':
+        # Resolves the engine on first use, after any fork
+        return PostgresBroker()
+    return InProcessBroker()
+
+
+broker = create_broker()
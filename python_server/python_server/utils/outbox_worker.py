@@ -0,0 +1,210 @@
+"""Background dispatcher for the transactional outbox.
+
+Claims due OutboxEvent rows in batches, runs the handler registered for
+each event type inside a savepoint, and commits the whole batch at once.
+Failed events are retried with exponential backoff until OUTBOX_MAX_ATTEMPTS,
+after which they stay in the table as dead letters for inspection. Every
+OUTBOX_PURGE_INTERVAL the loop deletes processed events older than
+OUTBOX_RETENTION_HOURS and dead letters older than OUTBOX_DEAD_RETENTION_HOURS,
+in batches of OUTBOX_PURGE_BATCH_SIZE, so the table stays small.
+
+Runs as a daemon thread inside each app process (OUTBOX_DISPATCHER=thread),
+or standalone:
+    python -m utils.outbox_worker
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from config import (
+    OUTBOX_BATCH_SIZE, OUTBOX_POLL_INTERVAL, OUTBOX_MAX_ATTEMPTS, OUTBOX_RETENTION_HOURS,
+    OUTBOX_DEAD_RETENTION_HOURS, OUTBOX_PURGE_INTERVAL, OUTBOX_PURGE_BATCH_SIZE
+)
+from database import SessionLocal
+from models.outbox import OutboxEvent, outbox_signal
+from models.notification import Notification
+
+logger = logging.getLogger(__name__)
+
+
+def handle_product_created(db, payload):
+    Notification.add(db, f'New product "{payload["name"]}" has been added to the catalog.')
+
+
+def handle_products_imported(db, payload):
+    Notification.add(db, f'{payload["count"]} new products have been added to the catalog.')
+
+
+HANDLERS = {
+    'product.created': handle_product_created,
+    'products.imported': handle_products_imported,
+}
+
+
+class DispatcherStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.dispatched = 0
+        self.failed = 0
+        self.dead = 0
+        self.purged = 0
+        self.last_batch_seconds = 0.0
+        self.last_error = None
+
+    def record(self, dispatched, failed, dead, elapsed, last_error):
+        with self._lock:
+            self.batches += 1
+            self.dispatched += dispatched
+            self.failed += failed
+            self.dead += dead
+            self.last_batch_seconds = elapsed
+            if last_error:
+                self.last_error = last_error
+
+    def record_purge(self, purged):
+        with self._lock:
+            self.purged += purged
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'dispatched': self.dispatched,
+                'failed': self.failed,
+                'dead': self.dead,
+                'purged': self.purged,
+                'last_batch_seconds': round(self.last_batch_seconds, 6),
+                'last_error': self.last_error
+            }
+
+
+stats = DispatcherStats()
+
+
+def _backoff(attempts):
+    return timedelta(seconds=min(2 ** attempts, 300))
+
+
+def dispatch_batch(db, batch_size=OUTBOX_BATCH_SIZE):
+    """Process one batch of due events; returns how many were claimed"""
+    started = time.perf_counter()
+    events = OutboxEvent.claim_batch(db, batch_size, OUTBOX_MAX_ATTEMPTS)
+    dispatched = failed = dead = 0
+    last_error = None
+
+    for outbox_event in events:
+        handler = HANDLERS.get(outbox_event.event_type)
+        # Handlers may queue work on db.info (e.g. live notifications); undo it if they fail
+        info_snapshot = {key: list(value) if isinstance(value, list) else value for key, value in db.info.items()}
+        savepoint = db.begin_nested()
+        try:
+            if handler is None:
+                raise LookupError(f"No handler for event type {outbox_event.event_type!r}")
+            handler(db, outbox_event.payload)
+            savepoint.commit()
+            outbox_event.processed_at = datetime.utcnow()
+            dispatched += 1
+        except Exception as e:
+            savepoint.rollback()
+            db.info.clear()
+            db.info.update(info_snapshot)
+            outbox_event.attempts += 1
+            outbox_event.last_error = f"{type(e).__name__}: {e}"[:1000]
+            outbox_event.available_at = datetime.utcnow() + _backoff(outbox_event.attempts)
+            last_error = outbox_event.last_error
+            failed += 1
+            if outbox_event.attempts >= OUTBOX_MAX_ATTEMPTS:
+                dead += 1
+            logger.warning("Outbox event %s failed (attempt %s): %s",
+                           outbox_event.id, outbox_event.attempts, outbox_event.last_error)
+
+    db.commit()
+    if events:
+        stats.record(dispatched, failed, dead, time.perf_counter() - started, last_error)
+    return len(events)
+
+
+def drain(batch_size=OUTBOX_BATCH_SIZE):
+    """Dispatch batches until no due event is left"""
+    total = 0
+    while True:
+        db = SessionLocal()
+        try:
+            claimed = dispatch_batch(db, batch_size)
+        finally:
+            db.close()
+        total += claimed
+        if claimed < batch_size:
+            return total
+
+
+def purge(batch_size=OUTBOX_PURGE_BATCH_SIZE):
+    """Delete expired processed events and dead letters, committing one bounded batch at a time"""
+    now = datetime.utcnow()
+    processed_before = now - timedelta(hours=OUTBOX_RETENTION_HOURS)
+    dead_before = now - timedelta(hours=OUTBOX_DEAD_RETENTION_HOURS)
+    total = 0
+    while True:
+        db = SessionLocal()
+        try:
+            deleted = OutboxEvent.purge_batch(db, processed_before, dead_before, OUTBOX_MAX_ATTEMPTS, batch_size)
+            db.commit()
+        finally:
+            db.close()
+        total += deleted
+        if deleted < batch_size:
+            break
+    if total:
+        stats.record_purge(total)
+        logger.info("Purged %d expired outbox events", total)
+    return total
+
+
+def run_forever(poll_interval=OUTBOX_POLL_INTERVAL, purge_interval=OUTBOX_PURGE_INTERVAL):
+    next_purge = time.monotonic()
+    while True:
+        try:
+            drain()
+        except Exception:
+            logger.exception("Outbox dispatcher batch failed")
+        if time.monotonic() >= next_purge:
+            next_purge = time.monotonic() + purge_interval
+            try:
+                purge()
+            except Exception:
+                logger.exception("Outbox purge failed")
+        # Woken early when this process commits new events
+        outbox_signal.wait(poll_interval)
+        outbox_signal.clear()
+
+
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def start_dispatcher_thread():
+    global _thread
+    with _thread_lock:
+        if _thread is None:
+            _thread = threading.Thread(target=run_forever, name='outbox-dispatcher', daemon=True)
+            _thread.start()
+    return _thread
+
+
+def status():
+    db = SessionLocal()
+    try:
+        return {
+            **stats.as_dict(),
+            'pending': OutboxEvent.pending_count(db, OUTBOX_MAX_ATTEMPTS),
+            'dead_letters': OutboxEvent.dead_count(db, OUTBOX_MAX_ATTEMPTS),
+            'running': _thread is not None and _thread.is_alive()
+        }
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    run_forever()
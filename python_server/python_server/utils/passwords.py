@@ -0,0 +1,143 @@
+"""Salted scrypt password hashes, computed on a bounded worker pool.
+
+Stored hashes are versioned by their format:
+    scrypt$<n>$<r>$<p>$<salt>$<hash>   current (base64 salt and hash)
+    <64 hex digits>                    legacy unsalted SHA-256
+A login that verifies against a legacy hash, or against scrypt parameters
+older than the configured ones, returns a fresh hash to store in its place.
+
+scrypt deliberately costs ~50-100 ms of CPU and PASSWORD_SCRYPT_N * R * 128
+bytes of memory, so hashing runs on PASSWORD_HASH_WORKERS threads
+(hashlib.scrypt releases the GIL) rather than on the request thread. At
+most PASSWORD_HASH_QUEUE jobs wait for a free worker; beyond that, or when
+a result takes longer than PASSWORD_HASH_TIMEOUT, PasswordHashingBusy is
+raised so the caller can answer 503 right away instead of piling up
+requests behind a login spike. PASSWORD_HASH_WORKERS=0 hashes inline.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from config import (
+    PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P,
+    PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE, PASSWORD_HASH_TIMEOUT
+)
+
+SCHEME = 'scrypt'
+SALT_BYTES = 16
+KEY_BYTES = 32
+LEGACY_SHA256 = re.compile(r'[0-9a-f]{64}')
+
+
+class PasswordHashingBusy(Exception):
+    """The hashing pool is saturated; retry shortly"""
+
+
+def _b64encode(data):
+    return base64.b64encode(data).decode().rstrip('=')
+
+
+def _b64decode(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+def _scrypt(password, salt, n, r, p):
+    # OpenSSL rejects anything above maxmem, which defaults to 32 MiB
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=2 * 128 * n * r * p, dklen=KEY_BYTES)
+
+
+def make_hash(password):
+    """Hash `password` in the current format; runs on the calling thread"""
+    salt = os.urandom(SALT_BYTES)
+    n, r, p = PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P
+    return f"{SCHEME}${n}${r}${p}${_b64encode(salt)}${_b64encode(_scrypt(password, salt, n, r, p))}"
+
+
+def check_hash(password, stored):
+    """Return (matches, new_hash); new_hash is set when a match is stored in an outdated format"""
+    if not stored:
+        return False, None
+    if LEGACY_SHA256.fullmatch(stored):
+        matches = hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+        return matches, make_hash(password) if matches else None
+    try:
+        scheme, n, r, p, salt, expected = stored.split('$')
+        n, r, p = int(n), int(r), int(p)
+        salt, expected = _b64decode(salt), _b64decode(expected)
+    except ValueError:
+        return False, None
+    if scheme != SCHEME:
+        return False, None
+    matches = hmac.compare_digest(_scrypt(password, salt, n, r, p), expected)
+    outdated = (n, r, p) != (PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P)
+    return matches, make_hash(password) if matches and outdated else None
+
+
+# A real hash to verify against when the account does not exist, so unknown
+# emails take as long as wrong passwords; computed on first use
+_dummy_hash = None
+
+# Jobs running or waiting for a worker; at most the workers plus PASSWORD_HASH_QUEUE
+_capacity = PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE
+_in_flight = 0
+_executor = None
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash')
+    return _executor
+
+
+def _finished(_):
+    global _in_flight
+    with _lock:
+        _in_flight -= 1
+
+
+def _run(fn, *args):
+    """Run `fn` on the pool and wait for it, or raise PasswordHashingBusy"""
+    global _in_flight
+    if PASSWORD_HASH_WORKERS <= 0:
+        return fn(*args)
+    with _lock:
+        if _in_flight >= _capacity:
+            raise PasswordHashingBusy()
+        _in_flight += 1
+        try:
+            future = _get_executor().submit(fn, *args)
+        except BaseException:
+            _in_flight -= 1
+            raise
+    # The slot stays taken until the job finishes, even if the caller stops waiting
+    future.add_done_callback(_finished)
+    try:
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+    except TimeoutError:
+        raise PasswordHashingBusy()
+
+
+def hash_password(password):
+    """Hash a new password on the pool"""
+    return _run(make_hash, password)
+
+
+def verify_password(password, stored):
+    """Check `password` against a stored hash (or None) on the pool; returns (matches, new_hash)"""
+    global _dummy_hash
+    if stored is None:
+        if _dummy_hash is None:
+            _dummy_hash = _run(make_hash, '')
+        _run(check_hash, password, _dummy_hash)
+        return False, None
+    return _run(check_hash, password, stored)
+
+
+def status():
+    return {'workers': PASSWORD_HASH_WORKERS, 'capacity': _capacity, 'in_flight': _in_flight}
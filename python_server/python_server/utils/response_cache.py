@@ -0,0 +1,173 @@
+"""Cache for catalog read responses, invalidated by a catalog version counter.
+
+Cached GET views are keyed by path, the relevant query arguments and the
+current catalog version. Any product write bumps the version, so every
+cached catalog response becomes unreachable at once. Responses carry a
+strong ETag and Last-Modified; conditional requests that match a cached
+entry are answered with 304 without running the view (and so without
+touching the database). Bodies large enough to compress are stored with
+their gzip/brotli encodings, so a hit costs no compression either. Misses
+shortly after a bump read from the primary, so a lagging replica cannot
+cache the old catalog under the new version.
+
+The backend is chosen by RESPONSE_CACHE_URL: `memory://` (default) keeps a
+per-process LRU, `redis://...` shares entries and the version counter
+between replicas. Anything with Redis' get/set(ex=)/incr methods works as
+a client, so a local stand-in can be passed to RedisBackend directly.
+"""
+import base64
+import hashlib
+import json
+import threading
+import time
+from urllib.parse import urlencode
+from datetime import datetime, timezone
+from functools import wraps
+from flask import request, make_response, Response
+from config import RESPONSE_CACHE_URL, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL, READ_YOUR_WRITES_SECONDS
+from database import read_from_primary
+from utils.cache import TTLCache
+from utils.compression import apply_encoding, compress_all, negotiate
+
+VERSION_KEY = 'catalog:version'
+# Present for READ_YOUR_WRITES_SECONDS after a bump, while replicas may still lag
+RECENT_WRITE_KEY = 'catalog:recent-write'
+
+
+class MemoryBackend:
+    def __init__(self, maxsize, ttl):
+        self._entries = TTLCache(maxsize, ttl)
+        self._version = 0
+        self._bumped_at = None
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def set(self, key, entry):
+        self._entries.set(key, entry)
+
+    def get_version(self):
+        return self._version
+
+    def bump_version(self):
+        with self._lock:
+            self._version += 1
+            self._bumped_at = time.monotonic()
+            return self._version
+
+    def recently_bumped(self):
+        return self._bumped_at is not None and time.monotonic() - self._bumped_at < READ_YOUR_WRITES_SECONDS
+
+    def stats(self):
+        return self._entries.stats()
+
+
+class RedisBackend:
+    def __init__(self, client, ttl, prefix='response-cache:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if not raw:
+            return None
+        entry = json.loads(raw)
+        # Entries written before compressed bodies were cached have no encodings
+        entry['encodings'] = {name: base64.b64decode(body) for name, body in entry.get('encodings', {}).items()}
+        return entry
+
+    def set(self, key, entry):
+        encodings = {name: base64.b64encode(body).decode() for name, body in entry['encodings'].items()}
+        self.client.set(self.prefix + key, json.dumps({**entry, 'encodings': encodings}), ex=self.ttl)
+
+    def get_version(self):
+        return int(self.client.get(self.prefix + VERSION_KEY) or 0)
+
+    def bump_version(self):
+        self.client.set(self.prefix + RECENT_WRITE_KEY, 1, ex=READ_YOUR_WRITES_SECONDS)
+        return self.client.incr(self.prefix + VERSION_KEY)
+
+    def recently_bumped(self):
+        return bool(self.client.exists(self.prefix + RECENT_WRITE_KEY))
+
+    def stats(self):
+        return {}
+
+
+def create_backend(url):
+    if url.startswith('redis://') or url.startswith('rediss://'):
+        import redis
+        return RedisBackend(redis.Redis.from_url(url), RESPONSE_CACHE_TTL)
+    return MemoryBackend(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+
+backend = create_backend(RESPONSE_CACHE_URL)
+_counters = {'hits': 0, 'misses': 0, 'not_modified': 0}
+_counters_lock = threading.Lock()
+
+
+def _count(name):
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog response; call after product writes"""
+    return backend.bump_version()
+
+
+def stats():
+    return {**_counters, 'version': backend.get_version(), 'backend': backend.stats()}
+
+
+def _conditional(entry):
+    response = Response(entry['body'], status=200, mimetype='application/json')
+    response.set_etag(entry['etag'])
+    response.last_modified = datetime.fromtimestamp(entry['last_modified'], timezone.utc)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    response.make_conditional(request)
+    if response.status_code == 304:
+        _count('not_modified')
+    elif entry['encodings']:
+        encoding = negotiate(tuple(entry['encodings']))
+        if encoding:
+            apply_encoding(response, encoding, entry['encodings'][encoding])
+    return response
+
+
+def catalog_cached(args=()):
+    """Cache a catalog GET view by path, the given query args and the catalog version"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*view_args, **view_kwargs):
+            params = urlencode([(name, request.args[name]) for name in args if name in request.args])
+            key = f"v{backend.get_version()}:{request.path}?{params}"
+
+            entry = backend.get(key)
+            if entry is not None:
+                _count('hits')
+                return _conditional(entry)
+
+            _count('misses')
+            if backend.recently_bumped():
+                # A lagging replica could put the previous catalog in the cache under the new version
+                read_from_primary()
+            response = make_response(view(*view_args, **view_kwargs))
+            if response.status_code != 200:
+                return response
+
+            body = response.get_data(as_text=True)
+            encoded = body.encode()
+            entry = {
+                'body': body,
+                'etag': hashlib.sha256(encoded).hexdigest()[:32],
+                'last_modified': int(datetime.now(timezone.utc).timestamp()),
+                'encodings': compress_all(encoded)
+            }
+            backend.set(key, entry)
+            return _conditional(entry)
+        return wrapper
+    return decorator
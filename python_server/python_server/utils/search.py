@@ -0,0 +1,140 @@
+"""Indexed, ranked product search.
+
+PostgreSQL: a generated `search_vector` tsvector column (GIN indexed) covers
+name and description, and a pg_trgm GIN index on `name` keeps substring
+matches indexable. SQLite: an external-content FTS5 table kept in sync by
+triggers, ranked with bm25. Other backends fall back to ILIKE.
+"""
+import re
+from contextlib import contextmanager
+from sqlalchemy import text, select, or_, false, func, literal_column
+from config import SEARCH_LANGUAGE
+
+_POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"""ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('{SEARCH_LANGUAGE}', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('{SEARCH_LANGUAGE}', coalesce(description, '')), 'B')
+        ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING GIN (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING GIN (name gin_trgm_ops)",
+]
+
+_SQLITE_INSERT_TRIGGER = """CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description) VALUES (new.rowid, new.name, new.description);
+    END"""
+
+_SQLITE_DDL = [
+    _SQLITE_INSERT_TRIGGER,
+    """CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.rowid, old.name, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.rowid, old.name, old.description);
+        INSERT INTO products_fts(rowid, name, description) VALUES (new.rowid, new.name, new.description);
+    END""",
+]
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def setup_search_index(engine):
+    """Create the search structures for the engine's dialect (idempotent)"""
+    with engine.begin() as conn:
+        if engine.dialect.name == 'postgresql':
+            for statement in _POSTGRES_DDL:
+                conn.execute(text(statement))
+        elif engine.dialect.name == 'sqlite':
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'")
+            ).first()
+            if not exists:
+                conn.execute(text(
+                    "CREATE VIRTUAL TABLE products_fts USING fts5("
+                    "name, description, content='products', content_rowid='rowid', "
+                    "tokenize='unicode61 remove_diacritics 2')"
+                ))
+                # Index rows inserted before the FTS table existed
+                conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+            for statement in _SQLITE_DDL:
+                conn.execute(text(statement))
+
+
+@contextmanager
+def deferred_search_index(db):
+    """Index rows inserted inside the block with one statement instead of a trigger per row.
+
+    On SQLite the insert trigger is dropped and recreated within the caller's
+    transaction, so other connections never observe it missing. PostgreSQL's
+    generated column needs no help.
+    """
+    if db.get_bind().dialect.name != 'sqlite':
+        yield
+        return
+
+    last_rowid = db.execute(text("SELECT coalesce(max(rowid), 0) FROM products")).scalar()
+    db.execute(text("DROP TRIGGER IF EXISTS products_fts_insert"))
+    yield
+    db.execute(
+        text("INSERT INTO products_fts(rowid, name, description) "
+             "SELECT rowid, name, description FROM products WHERE rowid > :last_rowid"),
+        {"last_rowid": last_rowid}
+    )
+    db.execute(text(_SQLITE_INSERT_TRIGGER))
+
+
+def fts5_match_expression(search_query):
+    """Turn free text into an FTS5 query: every term must match, the last one as a prefix"""
+    tokens = _TOKEN_RE.findall(search_query)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def apply_product_search(db, query, search_query, ranked=False):
+    """Filter a Product query by `search_query`, optionally ordering by relevance"""
+    from models.product import Product
+
+    dialect = db.get_bind().dialect.name
+    pattern = f"%{escape_like(search_query)}%"
+
+    if dialect == 'postgresql':
+        tsquery = func.websearch_to_tsquery(literal_column(f"'{SEARCH_LANGUAGE}'::regconfig"), search_query)
+        vector = literal_column('products.search_vector')
+        query = query.filter(or_(vector.op('@@')(tsquery), Product.name.ilike(pattern, escape='\\')))
+        if ranked:
+            query = query.order_by(
+                func.ts_rank(vector, tsquery).desc(),
+                func.similarity(Product.name, search_query).desc()
+            )
+        return query
+
+    if dialect == 'sqlite':
+        match = fts5_match_expression(search_query)
+        if match is None:
+            return query.filter(false())
+        matches = (
+            select(literal_column('rowid').label('rowid'), literal_column('rank').label('rank'))
+            .select_from(text('products_fts'))
+            .where(text('products_fts MATCH :fts_match').bindparams(fts_match=match))
+            .subquery()
+        )
+        query = query.join(matches, literal_column('products.rowid') == matches.c.rowid)
+        if ranked:
+            # FTS5 rank is bm25: lower is more relevant
+            query = query.order_by(matches.c.rank)
+        return query
+
+    return query.filter(or_(
+        Product.name.ilike(pattern, escape='\\'),
+        Product.description.ilike(pattern, escape='\\')
+    ))
@@ -0,0 +1,255 @@
+"""Deterministic synthetic dataset generator.
+
+Generates users, products and notifications with bulk inserts (COPY on
+PostgreSQL) from a random seed: the same seed and sizes always produce the
+same ids, names, prices and relative timestamps. A `seed_runs` marker row
+makes sure only one process seeds a database, so replicas booting together
+do not race. Batches commit as they go; a run that fails part way is marked
+'failed', and the next run with the same parameters regenerates the same
+rows and inserts only the batches that are missing.
+
+Run once per database, e.g. to reproduce production-sized data locally:
+    python -m utils.seeder --users 1000 --products 1000000 --notifications 10000 --seed 42
+"""
+import argparse
+import logging
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select
+from database import SessionLocal
+from models.user import User
+from models.product import Product, invalidate_catalog
+from models.notification import Notification, NotificationCounter, TOTAL_COUNTER
+from models.seed_run import SeedRun
+from utils.passwords import make_hash
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_DATA = 'sample_data'
+BATCH_SIZE = 10000
+
+ADMIN = {
+    'name': 'Admin User',
+    'email': 'admin@example.com',
+    'password': 'admin123',
+    'phone': '+1234567890',
+    'profile_image': 'https://picsum.photos/150/150?random=admin',
+}
+# Every synthetic user shares this password
+USER_PASSWORD = 'password123'
+
+ADJECTIVES = [
+    'red', 'blue', 'green', 'vintage', 'compact', 'wireless', 'organic', 'premium',
+    'portable', 'classic', 'smart', 'ergonomic', 'rustic', 'deluxe', 'mini', 'solar'
+]
+NOUNS = [
+    'lamp', 'chair', 'keyboard', 'backpack', 'kettle', 'speaker', 'notebook', 'bottle',
+    'jacket', 'watch', 'camera', 'blender', 'pillow', 'router', 'drone', 'sneaker'
+]
+FIRST_NAMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', 'Felipe', 'Gabriela', 'Henrique', 'Isabela', 'João']
+LAST_NAMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa', 'Almeida', 'Ferreira', 'Rocha']
+NOTIFICATION_MESSAGES = [
+    'Welcome to Product App! Your account has been created successfully.',
+    'New product "Product 50" has been added to the catalog.',
+    'Your profile has been updated successfully.',
+    'System maintenance scheduled for tomorrow at 2 AM.',
+    'You have 5 new products in your catalog.',
+    'Don\'t forget to check out the latest features!'
+]
+
+
+def product_name(rng, i):
+    return f"{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS).title()} {i}"
+
+
+def product_details(rng, i, sample=False):
+    """Name, description and price of product `i`; `sample` keeps the default catalog's "Product <i>" names"""
+    if sample:
+        # The sample notifications and client demos refer to these names
+        return {
+            'name': f'Product {i}',
+            'description': f'This is a sample product {i} with detailed description.',
+            'price': round(10.99 + (i * 2.5), 2),
+        }
+    return {
+        'name': product_name(rng, i),
+        'description': f"A {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} for everyday use.",
+        'price': round(1 + rng.random() * 500, 2),
+    }
+
+
+def seeded_rng(seed, stream):
+    """Independent random stream per entity kind, so ids never repeat across kinds"""
+    return random.Random(f"{seed}:{stream}")
+
+
+def random_uuid(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def unseeded(db, table, rows):
+    """Rows whose ids are not in `table` yet, for a run resuming after a partial failure"""
+    existing = set(db.execute(select(table.c.id).where(table.c.id.in_([row['id'] for row in rows]))).scalars())
+    return [row for row in rows if row['id'] not in existing]
+
+
+def seed_users(db, rng, count, start, batch_size=BATCH_SIZE, resume=False):
+    """Insert the admin plus `count` synthetic users; returns their ids"""
+    admin_id = random_uuid(rng)
+    admin = [{
+        'id': admin_id,
+        'name': ADMIN['name'],
+        'email': ADMIN['email'],
+        'password': make_hash(ADMIN['password']),
+        'phone': ADMIN['phone'],
+        'profile_image': ADMIN['profile_image'],
+        'created_at': start,
+    }]
+    if resume:
+        admin = unseeded(db, User.__table__, admin)
+    if admin:
+        db.execute(insert(User.__table__), admin)
+    user_ids = [admin_id]
+
+    hashed_password = make_hash(USER_PASSWORD)
+    for offset in range(0, count, batch_size):
+        rows = []
+        for i in range(offset, min(offset + batch_size, count)):
+            user_id = random_uuid(rng)
+            user_ids.append(user_id)
+            rows.append({
+                'id': user_id,
+                'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                'email': f"user{i + 1}@example.com",
+                'password': hashed_password,
+                'phone': f"+55119{rng.randrange(10 ** 8):08d}",
+                'profile_image': f"https://picsum.photos/150/150?random=user{i + 1}",
+                'created_at': start + timedelta(seconds=i + 1),
+            })
+        if resume:
+            rows = unseeded(db, User.__table__, rows)
+        if rows:
+            db.execute(insert(User.__table__), rows)
+        db.commit()
+    return user_ids
+
+
+def seed_products(db, rng, count, owner_ids, start, batch_size=BATCH_SIZE, sample=False, resume=False):
+    """Insert `count` products spread one second apart after `start`"""
+    for offset in range(0, count, batch_size):
+        rows = [
+            {
+                'id': random_uuid(rng),
+                **product_details(rng, i + 1, sample),
+                'image_url': f"https://picsum.photos/300/300?random={i + 1}",
+                'created_at': start + timedelta(seconds=i),
+                'created_by': rng.choice(owner_ids),
+            }
+            for i in range(offset, min(offset + batch_size, count))
+        ]
+        if resume:
+            rows = unseeded(db, Product.__table__, rows)
+        Product.bulk_insert(db, rows)
+        db.commit()
+    invalidate_catalog()
+
+
+def seed_notifications(db, rng, count, start, batch_size=BATCH_SIZE, resume=False):
+    """Insert `count` notifications without publishing them to live subscribers"""
+    for offset in range(0, count, batch_size):
+        rows = [
+            {
+                'id': random_uuid(rng),
+                'message': NOTIFICATION_MESSAGES[i % len(NOTIFICATION_MESSAGES)],
+                'created_at': start + timedelta(seconds=i),
+            }
+            for i in range(offset, min(offset + batch_size, count))
+        ]
+        if resume:
+            rows = unseeded(db, Notification.__table__, rows)
+        if rows:
+            db.execute(insert(Notification.__table__), rows)
+            NotificationCounter.increment(db, TOTAL_COUNTER, len(rows))
+        db.commit()
+
+
+def seed_database(users=0, products=100, notifications=6, seed=42, batch_size=BATCH_SIZE, name=SAMPLE_DATA,
+                  sample=False):
+    """Seed the dataset once; returns False if it was already seeded (or is being seeded).
+
+    A run that failed part way is resumed when called again with the same parameters.
+
+    `sample` names the products "Product <i>" like the default catalog instead of
+    the synthetic "Adjective Noun <i>" names used for large datasets.
+    """
+    db = SessionLocal()
+    try:
+        Notification.ensure_counters(db)
+        params = {'users': users, 'products': products, 'notifications': notifications, 'sample': sample}
+        resume = not SeedRun.claim(db, name, seed, params)
+        if resume:
+            seed_run = SeedRun.resume(db, name)
+            if seed_run is None:
+                return False
+            if seed_run.seed != seed or seed_run.params != params:
+                # Finishing it with other parameters would leave a mix of two datasets
+                SeedRun.finish(db, name, status='failed')
+                logger.warning("Seed run %r failed part way with seed %s and %s; rerun with those to resume it",
+                               name, seed_run.seed, seed_run.params)
+                return False
+            logger.info("Resuming seed run %r that failed part way", name)
+        elif db.query(User).first() or db.query(Product).first():
+            # Databases seeded before the marker existed
+            SeedRun.finish(db, name, status='skipped')
+            return False
+
+        try:
+            # Timestamps are laid out backwards from the claim so the newest rows are the latest
+            # seeded, and a resumed run regenerates the same rows
+            now = db.get(SeedRun, name).started_at.replace(microsecond=0)
+            user_ids = seed_users(db, seeded_rng(seed, 'users'), users,
+                                  now - timedelta(seconds=users + 1), batch_size, resume)
+            seed_products(db, seeded_rng(seed, 'products'), products, user_ids,
+                          now - timedelta(seconds=products), batch_size, sample, resume)
+            seed_notifications(db, seeded_rng(seed, 'notifications'), notifications,
+                               now - timedelta(seconds=notifications), batch_size, resume)
+        except Exception:
+            db.rollback()
+            SeedRun.finish(db, name, status='failed')
+            raise
+        SeedRun.finish(db, name)
+        return True
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=0, help='synthetic users besides the admin')
+    parser.add_argument('--products', type=int, default=100)
+    parser.add_argument('--notifications', type=int, default=6)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--force', action='store_true', help='drop a stale marker left by a crashed run')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(message)s')
+
+    from utils.data_initializer import create_tables
+    create_tables()
+    if args.force:
+        db = SessionLocal()
+        SeedRun.release(db, SAMPLE_DATA)
+        db.close()
+
+    started = time.perf_counter()
+    if seed_database(args.users, args.products, args.notifications, args.seed, args.batch_size):
+        logger.info("Seeded %d users, %d products and %d notifications in %.1fs",
+                    args.users + 1, args.products, args.notifications, time.perf_counter() - started)
+    else:
+        logger.info("Database already seeded; nothing to do (see the seed_runs table)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,320 @@
+"""In-process typeahead index for product names (GET /api/products/suggest).
+
+Names are accent-folded and lowercased, then split into words. The index
+keeps the sorted vocabulary packed in one UTF-8 blob, so the words
+starting with a prefix are one bisect away, and each word's name
+positions (4 bytes each) in one flat array. Names are packed the same
+way and ids take 16 bytes each, so memory grows with the text indexed
+rather than with a Python object per name or word. The last word of a
+query matches as a prefix and earlier words must match whole words:
+"wireless back" finds "Wireless Backpack".
+
+Each serving process builds the index from a streamed (id, name) column
+load when it starts. Products created in the process are added as they
+commit. A background thread rebuilds the index every
+SUGGEST_REFRESH_SECONDS, or sooner once SUGGEST_MAX_PENDING products have
+been added since the last build, so products written by other replicas
+or bulk imports show up too.
+"""
+import bisect
+import logging
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from array import array
+from config import SUGGEST_REFRESH_SECONDS, SUGGEST_MAX_PENDING
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+# Beyond this many vocabulary words starting with the typed prefix, multi-word
+# queries check the prefix on candidate names instead of on every word's postings
+_MAX_PREFIX_WORDS = 32
+# Candidate names checked that way per query before giving up on more matches
+_MAX_CANDIDATES = 5000
+
+
+def normalize(text):
+    """Lowercase, accent-folded form of `text` ("Café" -> "cafe")"""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def words(text):
+    return _WORD_RE.findall(normalize(text))
+
+
+def _matches(name_words, complete, prefix):
+    return complete.issubset(name_words) and any(word.startswith(prefix) for word in name_words)
+
+
+def _intersect(seeks):
+    """Ascending positions present in every list; each seek(target) returns the list's first position >= target"""
+    candidate = 0
+    while True:
+        for seek in seeks:
+            position = seek(candidate)
+            if position is None:
+                return
+            if position != candidate:
+                candidate = position
+                break
+        else:
+            yield candidate
+            candidate += 1
+
+
+class _Packed:
+    """Sequence of byte strings stored in one blob; bisect-able without an object per entry"""
+
+    def __init__(self, items=()):
+        self.blob = bytearray()
+        self.offsets = array('I', [0])
+        for item in items:
+            self.append(item)
+
+    def append(self, item):
+        self.blob += item
+        self.offsets.append(len(self.blob))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return bytes(self.blob[self.offsets[index]:self.offsets[index + 1]])
+
+    def nbytes(self):
+        return len(self.blob) + self.offsets.itemsize * len(self.offsets)
+
+
+class SuggestIndex:
+    """Immutable vocabulary and postings, plus the products added since it was built"""
+
+    def __init__(self, rows=()):
+        """Build from (id, name) rows; rows sorted by name give alphabetical suggestions"""
+        postings_by_word = {}
+        self._names = _Packed()
+        self._ids = bytearray()
+        for position, (product_id, name) in enumerate(rows):
+            name = name or ''
+            self._names.append(name.encode())
+            self._ids += product_id.bytes
+            for word in set(words(name)):
+                postings = postings_by_word.get(word)
+                if postings is None:
+                    # Most words occur once (model numbers, SKUs); an int is far smaller than an array
+                    postings_by_word[word] = position
+                elif isinstance(postings, int):
+                    postings_by_word[word] = array('I', (postings, position))
+                else:
+                    postings.append(position)
+        # Code point order is UTF-8 byte order, so the packed words stay sorted
+        vocabulary = sorted(postings_by_word)
+        self._words = _Packed(word.encode() for word in vocabulary)
+        self._postings = array('I')
+        self._posting_offsets = array('I', [0])
+        for word in vocabulary:
+            postings = postings_by_word.pop(word)
+            if isinstance(postings, int):
+                self._postings.append(postings)
+            else:
+                self._postings += postings
+            self._posting_offsets.append(len(self._postings))
+        self._pending = []
+        self._lock = threading.Lock()
+        self.built_at = time.time()
+
+    def __len__(self):
+        return len(self._names)
+
+    def _entry(self, position):
+        return {'id': uuid.UUID(bytes=bytes(self._ids[position * 16:position * 16 + 16])),
+                'name': self._names[position].decode()}
+
+    def add(self, product_id, name, added_at=None):
+        """Make a product created after the build searchable; returns the pending count"""
+        with self._lock:
+            self._pending.append((frozenset(words(name)), product_id, name, added_at or time.time()))
+            return len(self._pending)
+
+    def pending_since(self, timestamp):
+        """Products added at or after `timestamp`, to carry over into a rebuilt index"""
+        with self._lock:
+            return [entry for entry in self._pending if entry[3] >= timestamp]
+
+    def search(self, query, limit=10):
+        """Up to `limit` {'id', 'name'} suggestions: recently added products first, then the index"""
+        query_words = words(query)
+        if not query_words or limit <= 0:
+            return []
+        prefix = query_words[-1]
+        complete = frozenset(query_words[:-1])
+
+        results = []
+        seen = set()
+        for name_words, product_id, name, _ in reversed(self._pending):
+            if _matches(name_words, complete, prefix) and product_id not in seen:
+                seen.add(product_id)
+                results.append({'id': product_id, 'name': name})
+                if len(results) >= limit:
+                    return results
+
+        for position in self._positions(complete, prefix):
+            entry = self._entry(position)
+            if entry['id'] not in seen:
+                seen.add(entry['id'])
+                results.append(entry)
+                if len(results) >= limit:
+                    break
+        return results
+
+    def _seek(self, word_index, target):
+        """First position >= target in a word's postings, or None"""
+        end = self._posting_offsets[word_index + 1]
+        index = bisect.bisect_left(self._postings, target, self._posting_offsets[word_index], end)
+        return self._postings[index] if index < end else None
+
+    def _positions(self, complete, prefix):
+        """Positions of names holding every word in `complete` and a word starting with `prefix`"""
+        prefix = prefix.encode()
+        first = bisect.bisect_left(self._words, prefix)
+        # 0xff never occurs in UTF-8, so this bounds every word starting with the prefix
+        last = bisect.bisect_left(self._words, prefix + b'\xff', first)
+        if first == last:
+            return
+        if not complete:
+            # Names under the exact word first, then under longer words
+            emitted = set()
+            for word_index in range(first, last):
+                for index in range(self._posting_offsets[word_index], self._posting_offsets[word_index + 1]):
+                    position = self._postings[index]
+                    if position not in emitted:
+                        emitted.add(position)
+                        yield position
+            return
+
+        seeks = []
+        for word in complete:
+            word = word.encode()
+            word_index = bisect.bisect_left(self._words, word)
+            if word_index == len(self._words) or self._words[word_index] != word:
+                return
+            seeks.append(lambda target, word_index=word_index: self._seek(word_index, target))
+        if last - first <= _MAX_PREFIX_WORDS:
+            def seek_prefix(target):
+                found = [p for p in (self._seek(index, target) for index in range(first, last)) if p is not None]
+                return min(found) if found else None
+            yield from _intersect(seeks + [seek_prefix])
+            return
+
+        prefix = prefix.decode()
+        for checked, position in enumerate(_intersect(seeks)):
+            if checked >= _MAX_CANDIDATES:
+                return
+            if any(word.startswith(prefix) for word in words(self._names[position].decode())):
+                yield position
+
+    def stats(self):
+        return {
+            'names': len(self),
+            'words': len(self._words),
+            'pending': len(self._pending),
+            'bytes': self._names.nbytes() + len(self._ids) + self._words.nbytes()
+                     + self._postings.itemsize * (len(self._postings) + len(self._posting_offsets)),
+            'built_at': self.built_at,
+        }
+
+
+def load(db, batch_size=10000):
+    """Build an index from a streamed (id, name) column load, ordered by name"""
+    from sqlalchemy import select
+    from models.product import Product
+
+    statement = select(Product.id, Product.name).order_by(Product.name, Product.id)
+    rows = db.execute(statement.execution_options(yield_per=batch_size))
+    return SuggestIndex(rows)
+
+
+_index = None
+_index_lock = threading.Lock()
+# Held while loading, so a first request and the refresher never load twice at once
+_build_lock = threading.Lock()
+_refresh_requested = threading.Event()
+
+
+def rebuild():
+    """Load a fresh index and swap it in, keeping products added while it loaded"""
+    global _index
+    from database import SessionLocal
+
+    started = time.time()
+    db = SessionLocal(replica=True)
+    try:
+        index = load(db)
+    finally:
+        db.close()
+    with _index_lock:
+        if _index is not None:
+            # Anything added since the load started may have committed after its snapshot
+            for name_words, product_id, name, added_at in _index.pending_since(started - 1):
+                index.add(product_id, name, added_at)
+        _index = index
+    logger.info("Suggest index built: %d names in %.2fs", len(index), time.time() - started)
+    return index
+
+
+def get_index():
+    """The current index, built on first use if the refresher has not done it yet"""
+    if _index is None:
+        with _build_lock:
+            if _index is None:
+                rebuild()
+    return _index
+
+
+def suggest(query, limit=10):
+    return get_index().search(query, limit)
+
+
+def add(product_id, name):
+    """Index a product this process just committed; a refresh is requested once enough pile up"""
+    index = _index
+    if index is not None and index.add(product_id, name) >= SUGGEST_MAX_PENDING:
+        request_refresh()
+
+
+def request_refresh():
+    _refresh_requested.set()
+
+
+def run_forever(interval=SUGGEST_REFRESH_SECONDS):
+    while True:
+        try:
+            with _build_lock:
+                rebuild()
+        except Exception:
+            logger.exception("Suggest index refresh failed")
+        _refresh_requested.wait(interval or None)
+        _refresh_requested.clear()
+
+
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def start_refresher_thread():
+    global _thread
+    with _thread_lock:
+        if _thread is None:
+            _thread = threading.Thread(target=run_forever, name='suggest-refresher', daemon=True)
+            _thread.start()
+    return _thread
+
+
+def stats():
+    index = _index
+    return index.stats() if index is not None else {'names': 0, 'built': False}